@@ -9,6 +9,7 @@ from anthropic import Anthropic
 from core.api_detector import APIDetector, APIType
 from core.history_compressor import HistoryCompressor
 from core.claude_tools import ClaudeTools
+from core.base_service import BaseAPIService, json_loads
 
 
 class ClaudeService:
@@ -24,6 +25,8 @@ class ClaudeService:
         self.enable_compression = enable_compression
         self.compressor = HistoryCompressor() if enable_compression else None
         self.tools = ClaudeTools()
+        self.tools_definition = self.tools.get_tools_definition()  # 工具定义是静态的，只构建一次
+        self.session = requests.Session()  # 复用 TCP/TLS 连接；请求头随凭据变化，按请求传入
 
         # Auto-detect API type using detector module
         self.api_type = APIDetector.detect(api_key, base_url, provider_type)
@@ -111,16 +114,7 @@ class ClaudeService:
 
     def _is_retryable_error(self, error_msg: str) -> bool:
         """检查是否是可重试的错误"""
-        retryable_keywords = [
-            'timeout',
-            'connection',
-            'network',
-            '503',
-            '502',
-            '429',  # Too Many Requests
-            'temporarily',
-        ]
-        return any(keyword.lower() in error_msg.lower() for keyword in retryable_keywords)
+        return BaseAPIService._is_retryable_error(error_msg)
 
     def _chat_stream_glm_native(self, user_message: str, system_prompt: Optional[str] = None,
                                temperature: float = 0.7, max_tokens: int = 4000, attachments: Optional[list] = None,
@@ -152,21 +146,18 @@ class ClaudeService:
             payload["thinking_mode"] = thinking_mode
 
         try:
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
+            response = self.session.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
             response.raise_for_status()
 
-            for line in response.iter_lines():
-                if not line or line.startswith(b'event: '):
+            for raw in BaseAPIService._iter_sse_data(response):
+                try:
+                    data = json_loads(raw)
+                    if data.get('choices') and len(data['choices']) > 0:
+                        delta = data['choices'][0].get('delta', {})
+                        if 'content' in delta:
+                            yield delta['content']
+                except json.JSONDecodeError:
                     continue
-                if line.startswith(b'data: '):
-                    try:
-                        data = json.loads(line[6:])
-                        if data.get('choices') and len(data['choices']) > 0:
-                            delta = data['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                yield delta['content']
-                    except json.JSONDecodeError:
-                        continue
         except requests.exceptions.RequestException as e:
             yield f"\n\n[错误] {str(e)}\n"
 
@@ -205,7 +196,7 @@ class ClaudeService:
                 }
             }
 
-            response = requests.post(url, json=payload, headers=self.headers, timeout=(10, 120), stream=False)
+            response = self.session.post(url, json=payload, headers=self.headers, timeout=(10, 120), stream=False)
             response.raise_for_status()
 
             data = response.json()
@@ -243,14 +234,12 @@ class ClaudeService:
                 "stream": True,
             }
 
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
+            response = self.session.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
             response.raise_for_status()
 
-            for line in response.iter_lines():
-                if not line or not line.startswith(b'data: '):
-                    continue
+            for raw in BaseAPIService._iter_sse_data(response):
                 try:
-                    data = json.loads(line[6:])
+                    data = json_loads(raw)
                     if data.get('choices') and len(data['choices']) > 0:
                         delta = data['choices'][0].get('delta', {})
                         if 'content' in delta:
@@ -303,7 +292,7 @@ class ClaudeService:
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "stream": True,
-                "tools": self.tools.get_tools_definition()
+                "tools": self.tools_definition
             }
 
             # 为GLM添加thinking_mode参数
@@ -311,7 +300,7 @@ class ClaudeService:
                 payload["thinking_mode"] = thinking_mode
 
             try:
-                response = requests.post(
+                response = self.session.post(
                     self.endpoint,
                     json=payload,
                     headers=self.headers,
@@ -343,7 +332,7 @@ class ClaudeService:
                         print(f"[STREAM] Event type: {last_event_type}")
                     elif line.startswith(b'data: '):
                         try:
-                            data = json.loads(line[6:])
+                            data = json_loads(line[6:])
                             print(f"[STREAM] Parsed JSON: type={data.get('type')}")
                             if data.get('type') == 'content_block_delta':
                                 delta = data.get('delta', {})
@@ -424,7 +413,7 @@ class ClaudeService:
                 max_tokens=max_tokens,
                 temperature=temperature,
                 messages=messages,
-                tools=self.tools.get_tools_definition() if self.tools else None
+                tools=self.tools_definition if self.tools else None
             )
 
             # 处理响应内容
@@ -3,7 +3,7 @@
 import requests
 import json
 from typing import Optional, Generator
-from .base_service import BaseAPIService
+from .base_service import BaseAPIService, json_loads
 
 
 class DeepSeekService(BaseAPIService):
@@ -19,6 +19,8 @@ class DeepSeekService(BaseAPIService):
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
                    temperature: float = 0.7, max_tokens: int = 4000,
@@ -46,22 +48,19 @@ class DeepSeekService(BaseAPIService):
         }
 
         try:
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
-            response.raise_for_status()
+            with self.session.post(self.endpoint, json=payload, timeout=(10, 120), stream=True) as response:
+                response.raise_for_status()
 
-            for line in response.iter_lines():
-                if not line or not line.startswith(b'data: '):
-                    continue
-                data_str = line[6:].decode('utf-8')
-                if data_str.strip() == '[DONE]':
-                    break
-                try:
-                    data = json.loads(data_str)
-                    if data.get('choices') and len(data['choices']) > 0:
-                        delta = data['choices'][0].get('delta', {})
-                        if 'content' in delta:
-                            yield delta['content']
-                except json.JSONDecodeError:
-                    continue
+                for raw in self._iter_sse_data(response):
+                    if raw.strip() == b'[DONE]':
+                        break
+                    try:
+                        data = json_loads(raw)
+                        if data.get('choices') and len(data['choices']) > 0:
+                            delta = data['choices'][0].get('delta', {})
+                            if 'content' in delta:
+                                yield delta['content']
+                    except json.JSONDecodeError:
+                        continue
         except requests.exceptions.RequestException as e:
             yield f"\n\n[错误] {str(e)}\n"
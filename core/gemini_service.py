@@ -16,6 +16,8 @@ class GeminiService(BaseAPIService):
             "Content-Type": "application/json",
             "x-goog-api-key": api_key
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
                    temperature: float = 0.7, max_tokens: int = 4000,
@@ -53,7 +55,7 @@ class GeminiService(BaseAPIService):
                 }
             }
 
-            response = requests.post(url, json=payload, headers=self.headers, timeout=(10, 120), stream=False)
+            response = self.session.post(url, json=payload, timeout=(10, 120))
             response.raise_for_status()
 
             data = response.json()
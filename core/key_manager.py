@@ -71,8 +71,7 @@ class KeyManager:
                 with open(self.config_path, "r", encoding="utf-8") as f:
                     data = json.load(f)
                 data["defaultConfiguration"] = config_id
-                with open(self.config_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                self.config_path.write_bytes(json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
             except Exception:
                 pass
             return True
@@ -128,8 +127,7 @@ class KeyManager:
                 "configurations": self.configs,
                 "defaultConfiguration": self.current_config_id
             }
-            with open(export_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            Path(export_path).write_bytes(json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8"))
             return True
         except Exception:
             return False
@@ -175,8 +173,8 @@ class KeyManager:
                 "configurations": self.configs,
                 "defaultConfiguration": self.current_config_id
             }
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # 一次性序列化后整体写入，避免 json.dump 逐片段调用 write
+            self.config_path.write_bytes(json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8"))
             return True
         except Exception as e:
             print(f"保存配置失败: {e}")
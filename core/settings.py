@@ -40,8 +40,8 @@ class SettingsManager:
     def save(self) -> None:
         """保存设置"""
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
+            # 一次性序列化后整体写入，避免 json.dump 逐片段调用 write
+            Path(self.settings_file).write_bytes(json.dumps(self.settings, ensure_ascii=False, indent=2).encode('utf-8'))
         except Exception as e:
             print(f"保存设置失败: {e}")
 
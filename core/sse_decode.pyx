@@ -0,0 +1,32 @@
+# cython: language_level=3
+# sse_decode.pyx - Anthropic SSE 流解码（逐 token 调用的热路径）
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+
+cdef object _delta_text(object payload):
+    """解析一个 data 负载，返回 content_block_delta 中的增量文本"""
+    try:
+        data = _loads(payload)
+    except ValueError:  # orjson / json 的 JSONDecodeError 都是 ValueError 子类
+        return None
+    if data.get('type') == 'content_block_delta':
+        delta = data.get('delta', {})
+        if delta.get('type') == 'text_delta':
+            return delta.get('text', '')
+    return None
+
+
+def iter_text_deltas(payloads):
+    """从 data 负载序列中产出增量文本
+
+    payloads 来自 BaseAPIService._iter_sse_data（唯一的 SSE 行切分实现），这里只加速逐 token 的解析
+    """
+    for payload in payloads:
+        text = _delta_text(payload)
+        if text:
+            yield text
@@ -89,19 +89,19 @@ fn find_project_by_cwd(cli_type: &str, cwd: &str) -> PyResult<Option<Project>> {
     }
 }
 
-/// 加载项目的会话列表
+/// 加载项目的会话列表（解析期间释放 GIL）
 #[pyfunction]
-fn load_project(cli_type: &str, project_id: &str) -> PyResult<Vec<SessionInfo>> {
+fn load_project(py: Python<'_>, cli_type: &str, project_id: &str) -> PyResult<Vec<SessionInfo>> {
     match cli_type {
         "claude" => {
             let provider = get_claude_provider()
                 .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Claude 目录不存在"))?;
-            Ok(provider.load_project(project_id))
+            Ok(py.allow_threads(|| provider.load_project(project_id)))
         }
         "codex" => {
             let provider = get_codex_provider()
                 .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Codex 目录不存在"))?;
-            Ok(provider.load_project(project_id))
+            Ok(py.allow_threads(|| provider.load_project(project_id)))
         }
         _ => Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
             format!("不支持的 CLI 类型: {}", cli_type),
@@ -109,19 +109,19 @@ fn load_project(cli_type: &str, project_id: &str) -> PyResult<Vec<SessionInfo>>
     }
 }
 
-/// 加载完整会话
+/// 加载完整会话（解析期间释放 GIL）
 #[pyfunction]
-fn load_session(cli_type: &str, file_path: &str) -> PyResult<Option<Session>> {
+fn load_session(py: Python<'_>, cli_type: &str, file_path: &str) -> PyResult<Option<Session>> {
     match cli_type {
         "claude" => {
             let provider = get_claude_provider()
                 .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Claude 目录不存在"))?;
-            Ok(provider.load_session(file_path))
+            Ok(py.allow_threads(|| provider.load_session(file_path)))
         }
         "codex" => {
             let provider = get_codex_provider()
                 .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Codex 目录不存在"))?;
-            Ok(provider.load_session(file_path))
+            Ok(py.allow_threads(|| provider.load_session(file_path)))
         }
         _ => Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
             format!("不支持的 CLI 类型: {}", cli_type),
@@ -198,6 +198,29 @@ fn delete_session(cli_type: &str, file_path: &str) -> PyResult<()> {
     }
 }
 
+/// 删除指定工作目录下所有项目的会话（移动到回收站），返回删除数量
+#[pyfunction]
+fn delete_sessions_by_cwd(py: Python<'_>, cli_type: &str, cwd: &str) -> PyResult<usize> {
+    let provider: &dyn CliHistoryProvider = match cli_type {
+        "claude" => get_claude_provider()
+            .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Claude 目录不存在"))?,
+        "codex" => get_codex_provider()
+            .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>("Codex 目录不存在"))?,
+        _ => return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("不支持的 CLI 类型: {}", cli_type),
+        )),
+    };
+    Ok(py.allow_threads(|| {
+        provider
+            .list_projects(0)
+            .into_iter()
+            .filter(|p| p.cwd.as_deref() == Some(cwd))
+            .flat_map(|p| provider.load_project(&p.id))
+            .filter(|s| provider.delete_session(&s.file_path).is_ok())
+            .count()
+    }))
+}
+
 /// 获取回收站项目列表
 #[pyfunction]
 fn get_trash_items(cli_type: &str) -> PyResult<Vec<TrashItem>> {
@@ -610,6 +633,7 @@ fn liangmu_history(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(load_session_paginated, m)?)?;
     m.add_function(wrap_pyfunction!(search, m)?)?;
     m.add_function(wrap_pyfunction!(delete_session, m)?)?;
+    m.add_function(wrap_pyfunction!(delete_sessions_by_cwd, m)?)?;
     m.add_function(wrap_pyfunction!(get_trash_items, m)?)?;
     m.add_function(wrap_pyfunction!(restore_from_trash, m)?)?;
     m.add_function(wrap_pyfunction!(permanently_delete, m)?)?;
@@ -9,6 +9,7 @@ import os
 import ctypes
 import threading
 import atexit
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import wintypes
 from pathlib import Path
 
@@ -26,6 +27,10 @@ def _cleanup_tray_on_exit():
 
 atexit.register(_cleanup_tray_on_exit)
 
+# 共享后台线程池（启动刷新、更新检查、热键注册等一次性任务复用线程）
+_bg_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ai_cli_bg')
+atexit.register(_bg_executor.shutdown, wait=False)
+
 # 设置 DPI 感知（必须在创建窗口前调用）
 if sys.platform == 'win32':
     try:
@@ -36,42 +41,76 @@ if sys.platform == 'win32':
         except Exception:
             pass
 
+# 按标题查找窗口（EnumWindows 比 FindWindow 更可靠）
+# 回调原型和回调对象只创建一次，避免每次查找都新建 ctypes 类型和 libffi 跳板
+_TITLE_PREFIX = "AI CLI Manager v"
+_TITLE_BUF_LEN = 512  # 更长的标题只比较前 511 个字符
+_enum_lock = threading.Lock()
+_enum_state = {'needle': '', 'hwnd': None}
+_enum_title_buf = ctypes.create_unicode_buffer(_TITLE_BUF_LEN)  # 受 _enum_lock 保护，所有回调复用
+
+
+def _enum_windows_callback(hwnd, _):
+    if ctypes.windll.user32.GetWindowTextW(hwnd, _enum_title_buf, _TITLE_BUF_LEN) > 0:
+        if _enum_state['needle'] in _enum_title_buf.value:
+            _enum_state['hwnd'] = hwnd
+            return False  # 停止枚举
+    return True
+
+
+if sys.platform == 'win32':
+    _EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    _enum_windows_proc = _EnumWindowsProc(_enum_windows_callback)
+
+
+def _find_window_by_title(needle: str):
+    """返回标题包含 needle 的第一个顶层窗口句柄，找不到返回 None"""
+    with _enum_lock:
+        _enum_state['needle'] = needle
+        _enum_state['hwnd'] = None
+        ctypes.windll.user32.EnumWindows(_enum_windows_proc, 0)
+        return _enum_state['hwnd']
+
+
 # 单实例锁（Windows）
 if sys.platform == 'win32':
     _mutex = ctypes.windll.kernel32.CreateMutexW(None, False, "AI_CLI_Manager_SingleInstance")
     if ctypes.windll.kernel32.GetLastError() == 183:  # ERROR_ALREADY_EXISTS
-        # 使用 EnumWindows 查找窗口（更可靠）
-        EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
-        found_hwnd = [None]
-
-        def enum_callback(hwnd, lparam):
-            length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
-            if length > 0:
-                buf = ctypes.create_unicode_buffer(length + 1)
-                ctypes.windll.user32.GetWindowTextW(hwnd, buf, length + 1)
-                if f"AI CLI Manager v" in buf.value:
-                    found_hwnd[0] = hwnd
-                    return False  # 停止枚举
-            return True
-
-        ctypes.windll.user32.EnumWindows(EnumWindowsProc(enum_callback), 0)
-        if found_hwnd[0]:
-            hwnd = found_hwnd[0]
+        hwnd = _find_window_by_title(_TITLE_PREFIX)
+        if hwnd:
             # 如果窗口最小化或隐藏，先恢复
             ctypes.windll.user32.ShowWindow(hwnd, 9)  # SW_RESTORE
             ctypes.windll.user32.SetForegroundWindow(hwnd)
         sys.exit(0)
+
+def _get_screen_height():
+    """获取主屏幕高度（失败时按 1080p 处理）"""
+    try:
+        return ctypes.windll.user32.GetSystemMetrics(1)
+    except Exception:
+        return 1080
+
+
+# 根据屏幕分辨率自适应窗口大小（进程内只计算一次）
+# 窗口宽度固定 1200，高度根据屏幕自适应：1080p 屏幕压缩高度，1200p 及以上 800
+WINDOW_WIDTH = 1200
+WINDOW_HEIGHT = 700 if _get_screen_height() <= 1080 else 800
+
 from ui.state import AppState
-from ui.common import VERSION, save_settings, flush_settings, detect_terminals, detect_python_envs
-from ui.clipboard_paste import setup_clipboard_paste, cleanup_clipboard_paste
+from ui.common import VERSION, save_settings, flush_settings, flush_prompt_writes, detect_terminals, detect_python_envs
+from ui.clipboard_paste import setup_clipboard_paste, cleanup_clipboard_paste, scan_clipboard_paste
 from ui.theme_manager import ThemeManager
 
+WINDOW_TITLE = f"{_TITLE_PREFIX}{VERSION}"
+
 # 获取图标路径（兼容打包后）
 if getattr(sys, 'frozen', False):
     BASE_DIR = Path(sys.executable).parent
 else:
     BASE_DIR = Path(__file__).parent
 ICON_PATH = str(BASE_DIR / "icon.ico")
+SCREENSHOT_DIR = str(BASE_DIR / "screenshots")
+PATH_PICKER_SCRIPT = str(BASE_DIR / "ui" / "tools" / "path_picker.py")
 from ui.database import history_manager, codex_history_manager, history_cache
 from ui.hotkey import setup_screenshot_hotkey, setup_copypath_hotkey, cleanup_hotkeys
 from ui.pages.api_keys import create_api_page
@@ -80,30 +119,21 @@ from ui.pages.mcp import create_mcp_page
 from ui.pages.history import create_history_page
 from ui.pages.skills import create_skills_page
 
+# 导入 Rust 历史记录模块
+try:
+    import liangmu_history as lh
+except ImportError:
+    lh = None
+
 # 全局托盘图标引用
 _tray_icon = None
 
 
 def main(page: ft.Page):
-    page.title = f"AI CLI Manager v{VERSION}"
+    page.title = WINDOW_TITLE
 
-    # 根据屏幕分辨率自适应窗口大小
-    screen_height = 1080
-    try:
-        user32 = ctypes.windll.user32
-        screen_height = user32.GetSystemMetrics(1)
-    except Exception:
-        pass
-
-    # 窗口宽度固定 1200，高度根据屏幕自适应
-    window_width = 1200
-    if screen_height <= 1080:
-        window_height = 700  # 1080p 屏幕压缩高度
-    else:
-        window_height = 800  # 1200p 及以上
-
-    page.window.width = window_width
-    page.window.height = window_height
+    page.window.width = WINDOW_WIDTH
+    page.window.height = WINDOW_HEIGHT
     page.padding = 0
     page.theme = ft.Theme(font_family="SimSun")
     page.window.icon = ICON_PATH
@@ -122,8 +152,8 @@ def main(page: ft.Page):
     def on_window_event(e):
         if e.data == "close":
             page.window.minimized = True
-            # 只有托盘存在时才隐藏任务栏图标
-            if _tray_icon:
+            # 只有托盘存在时才隐藏任务栏图标；已隐藏时无需再下发更新
+            if _tray_icon and not page.window.skip_task_bar:
                 page.window.skip_task_bar = True
                 page.update()
 
@@ -138,19 +168,7 @@ def main(page: ft.Page):
     # 窗口控制按钮（使用 Windows API 直接操作）
     def get_hwnd():
         """获取当前窗口句柄"""
-        EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
-        found = [None]
-        def cb(hwnd, _):
-            length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
-            if length > 0:
-                buf = ctypes.create_unicode_buffer(length + 1)
-                ctypes.windll.user32.GetWindowTextW(hwnd, buf, length + 1)
-                if f"AI CLI Manager v{VERSION}" in buf.value:
-                    found[0] = hwnd
-                    return False
-            return True
-        ctypes.windll.user32.EnumWindows(EnumWindowsProc(cb), 0)
-        return found[0]
+        return _find_window_by_title(WINDOW_TITLE)
 
     _hwnd_cache = [None]
 
@@ -163,8 +181,9 @@ def main(page: ft.Page):
         if _tray_icon:
             if hwnd:
                 ctypes.windll.user32.ShowWindow(hwnd, 0)  # SW_HIDE
-            page.window.skip_task_bar = True
-        page.update()
+            if not page.window.skip_task_bar:
+                page.window.skip_task_bar = True
+                page.update()
 
     def do_minimize(_):
         hwnd = _hwnd_cache[0] or get_hwnd()
@@ -186,7 +205,7 @@ def main(page: ft.Page):
         content=ft.Container(
             content=ft.Row([
                 ft.Icon(ft.Icons.TERMINAL, size=18, color=theme["text"]),
-                ft.Text(f"AI CLI Manager v{VERSION}", size=14, color=theme["text"], weight=ft.FontWeight.BOLD),
+                ft.Text(WINDOW_TITLE, size=14, color=theme["text"], weight=ft.FontWeight.BOLD),
                 ft.Container(expand=True),
                 ft.IconButton(ft.Icons.MINIMIZE, icon_size=16, icon_color=theme["text_sec"], on_click=do_minimize),
                 ft.IconButton(ft.Icons.CROP_SQUARE, icon_size=16, icon_color=theme["text_sec"], on_click=do_maximize),
@@ -200,32 +219,35 @@ def main(page: ft.Page):
     theme_mgr.set_title_bar(title_bar)
 
     # 页面懒加载 - 首次访问时才创建，减少启动时间
-    _pages = {}  # {idx: (page_control, refresh_func, extra_refresh_func)}
-    _page_creators = {
-        0: create_api_page,
-        1: create_prompts_page,
-        2: create_history_page,
-        3: create_mcp_page,
-        4: create_skills_page,
-    }
+    _page_creators = (
+        create_api_page,
+        create_prompts_page,
+        create_history_page,
+        create_mcp_page,
+        create_skills_page,
+    )
+    _pages = [None] * len(_page_creators)  # [idx] -> (page_control, refresh_func, extra_refresh_func)
 
     def get_or_create_page(idx):
         """懒加载获取页面"""
-        if idx not in _pages:
-            creator = _page_creators.get(idx)
-            if creator:
-                result = creator(state)
-                # 支持返回 2 个或 3 个值
-                if isinstance(result, tuple) and len(result) == 3:
-                    page_ctrl, refresh_fn, extra_fn = result
-                elif isinstance(result, tuple):
-                    page_ctrl, refresh_fn = result
-                    extra_fn = None
-                else:
-                    page_ctrl, refresh_fn, extra_fn = result, None, None
-                _pages[idx] = (page_ctrl, refresh_fn, extra_fn)
-                theme_mgr.register_page(idx, refresh_fn)
-        return _pages.get(idx, (None, None, None))
+        if not 0 <= idx < len(_pages):
+            return None, None, None
+        if _pages[idx] is None:
+            result = _page_creators[idx](state)
+            # 支持返回 2 个或 3 个值
+            if isinstance(result, tuple) and len(result) == 3:
+                page_ctrl, refresh_fn, extra_fn = result
+            elif isinstance(result, tuple):
+                page_ctrl, refresh_fn = result
+                extra_fn = None
+            else:
+                page_ctrl, refresh_fn, extra_fn = result, None, None
+            _pages[idx] = (page_ctrl, refresh_fn, extra_fn)
+            theme_mgr.register_page(idx, refresh_fn)
+            # 新建页面只在创建时扫描一次输入框，缓存的页面切换回来时无需重复扫描
+            if page_ctrl:
+                scan_clipboard_paste(page_ctrl)
+        return _pages[idx]
 
     # 启动时只创建首页
     api_page, refresh_api, _ = get_or_create_page(0)
@@ -246,24 +268,18 @@ def main(page: ft.Page):
             if idx == 0 and extra_fn:
                 extra_fn()
         content_area.bgcolor = t["surface"]
-        page.update()
+        # 只改动了内容区，局部刷新即可（导航栏选中态由客户端自行维护）
+        page.update(content_area)
 
     def toggle_theme(_):
         theme_mgr.toggle(current_page_idx[0])
 
     def switch_lang(_):
         state.toggle_lang()
-        L_new = state.L
         # 更新导航栏标签
-        nav_rail.destinations = [
-            ft.NavigationRailDestination(icon=ft.Icons.KEY, label=L_new['api_config']),
-            ft.NavigationRailDestination(icon=ft.Icons.CHAT, label=L_new['prompts']),
-            ft.NavigationRailDestination(icon=ft.Icons.HISTORY, label=L_new['history']),
-            ft.NavigationRailDestination(icon=ft.Icons.EXTENSION, label=L_new['mcp']),
-            ft.NavigationRailDestination(icon=ft.Icons.AUTO_FIX_HIGH, label=L_new.get('skills', 'Skills')),
-        ]
+        nav_rail.destinations = get_nav_destinations()
         # 清除页面缓存，下次访问时重建
-        _pages.clear()
+        _pages[:] = [None] * len(_pages)
         # 重建当前页面
         page_ctrl, _, _ = get_or_create_page(current_page_idx[0])
         if page_ctrl:
@@ -275,8 +291,38 @@ def main(page: ft.Page):
             ctypes.windll.user32.ShowWindow(hwnd, 9)  # SW_RESTORE
         page.update()
 
+    def open_url(url):
+        """直接交给系统浏览器打开，失败时再走 Flet 客户端"""
+        import subprocess
+        try:
+            if sys.platform == 'win32':
+                os.startfile(url)
+            elif sys.platform == 'darwin':
+                subprocess.Popen(['open', url])
+            else:
+                subprocess.Popen(['xdg-open', url])
+        except Exception:
+            page.launch_url(url)
+
     def open_feedback(_):
-        page.launch_url("https://github.com/LiangMu-Studio/AI_CLI_Manager/issues")
+        open_url("https://github.com/LiangMu-Studio/AI_CLI_Manager/issues")
+
+    # 导航栏项按语言缓存，切换语言时整体替换，来回切换复用同一批控件
+    _nav_destinations = {}  # {lang: [NavigationRailDestination, ...]}
+
+    def get_nav_destinations():
+        dests = _nav_destinations.get(state.lang)
+        if dests is None:
+            L_cur = state.L
+            dests = [
+                ft.NavigationRailDestination(icon=ft.Icons.KEY, label=L_cur['api_config']),
+                ft.NavigationRailDestination(icon=ft.Icons.CHAT, label=L_cur['prompts']),
+                ft.NavigationRailDestination(icon=ft.Icons.HISTORY, label=L_cur['history']),
+                ft.NavigationRailDestination(icon=ft.Icons.EXTENSION, label=L_cur['mcp']),
+                ft.NavigationRailDestination(icon=ft.Icons.AUTO_FIX_HIGH, label=L_cur.get('skills', 'Skills')),
+            ]
+            _nav_destinations[state.lang] = dests
+        return dests
 
     divider = ft.VerticalDivider(width=1, color=theme["border"])
     nav_rail = ft.NavigationRail(
@@ -284,13 +330,7 @@ def main(page: ft.Page):
         label_type=ft.NavigationRailLabelType.ALL,
         min_width=100,
         bgcolor=theme["surface"],
-        destinations=[
-            ft.NavigationRailDestination(icon=ft.Icons.KEY, label=L['api_config']),
-            ft.NavigationRailDestination(icon=ft.Icons.CHAT, label=L['prompts']),
-            ft.NavigationRailDestination(icon=ft.Icons.HISTORY, label=L['history']),
-            ft.NavigationRailDestination(icon=ft.Icons.EXTENSION, label=L['mcp']),
-            ft.NavigationRailDestination(icon=ft.Icons.AUTO_FIX_HIGH, label=L.get('skills', 'Skills')),
-        ],
+        destinations=get_nav_destinations(),
         on_change=switch_page,
         trailing=ft.Container(
             content=ft.Column([
@@ -313,35 +353,32 @@ def main(page: ft.Page):
     # 首次使用：全量扫描
     # 后续启动：只刷新 mtime > last_startup_time 的文件
     def incremental_refresh_history():
-        from concurrent.futures import ThreadPoolExecutor
-
         def refresh_cli(cli_type):
             """刷新单个 CLI 历史"""
             try:
-                import liangmu_history as lh
+                if lh is None:
+                    # Rust 模块不可用，回退
+                    if cli_type == 'claude' and history_manager:
+                        history_cache["claude"] = history_manager.load_sessions()
+                    elif cli_type == 'codex' and codex_history_manager:
+                        history_cache["codex"] = codex_history_manager.load_sessions()
+                    return 0
                 updated = lh.refresh_history_on_startup(cli_type)
                 if updated > 0:
                     print(f"[启动刷新] {cli_type.title()} 更新了 {updated} 个会话")
                 return updated
-            except ImportError:
-                # Rust 模块不可用，回退
-                if cli_type == 'claude' and history_manager:
-                    history_cache["claude"] = history_manager.load_sessions()
-                elif cli_type == 'codex' and codex_history_manager:
-                    history_cache["codex"] = codex_history_manager.load_sessions()
-                return 0
             except Exception as e:
                 print(f"[启动刷新] {cli_type} 错误: {e}")
                 return 0
 
-        # 并行刷新 Claude 和 Codex
-        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='history_') as executor:
-            futures = [executor.submit(refresh_cli, cli) for cli in ['claude', 'codex']]
-            for f in futures:
-                try:
-                    f.result(timeout=30)
-                except Exception:
-                    pass
+        # 并行刷新 Claude 和 Codex：Codex 交给线程池，Claude 在当前线程直接执行。
+        # 本函数本身就运行在 _bg_executor 中，不能把两项都提交后阻塞等待（线程池饥饿）
+        codex_future = _bg_executor.submit(refresh_cli, 'codex')
+        refresh_cli('claude')
+        try:
+            codex_future.result(timeout=30)
+        except Exception:
+            pass
 
     # 延迟 800ms 后在后台执行增量刷新，不阻塞 UI
     def delayed_refresh():
@@ -354,11 +391,10 @@ def main(page: ft.Page):
             sync_tool_usage_from_history()
         except Exception as e:
             print(f"[工具统计同步] 错误: {e}")
-    threading.Thread(target=delayed_refresh, daemon=True).start()
+    _bg_executor.submit(delayed_refresh)
 
     # 启动时检查更新
     def check_for_updates():
-        import threading
         def run():
             from core.update_checker import check_update
             has_update, new_ver, url = check_update(VERSION)
@@ -367,12 +403,12 @@ def main(page: ft.Page):
                     page.open(ft.SnackBar(
                         content=ft.Row([
                             ft.Text(L.get('update_available', f'发现新版本 v{new_ver}')),
-                            ft.TextButton(L.get('view_update', '查看'), on_click=lambda _: page.launch_url(url)),
+                            ft.TextButton(L.get('view_update', '查看'), on_click=lambda _: open_url(url)),
                         ]),
                         duration=10000,
                     ))
                 page.run_task(show_update)
-        threading.Thread(target=run, daemon=True).start()
+        _bg_executor.submit(run)
     check_for_updates()
 
     # 延迟注册快捷键，确保窗口完全初始化
@@ -383,7 +419,7 @@ def main(page: ft.Page):
         if state.settings.get('hotkey_enabled', True):
             setup_screenshot_hotkey(page=page)
             setup_copypath_hotkey(page=page)
-    threading.Thread(target=setup_hotkeys, daemon=True).start()
+    _bg_executor.submit(setup_hotkeys)
 
     # 注册 Win+V 剪贴板粘贴支持
     setup_clipboard_paste(page)
@@ -402,31 +438,31 @@ def main(page: ft.Page):
                     if hwnd:
                         ctypes.windll.user32.ShowWindow(hwnd, 9)  # SW_RESTORE
                         ctypes.windll.user32.SetForegroundWindow(hwnd)
-                    page.window.skip_task_bar = False
-                    page.update()
+                    if page.window.skip_task_bar:
+                        page.window.skip_task_bar = False
+                        page.update()
                 page.run_thread(do_show)
 
             def quit_app():
                 cleanup_hotkeys()  # 清理热键钩子
                 cleanup_clipboard_paste()  # 清理剪贴板钩子
                 flush_settings()  # 立即保存待写入的设置
+                flush_prompt_writes()  # 等待提示词文件写完
                 page.window.prevent_close = False  # 允许关闭
                 stop_tray(_tray_icon)
                 page.window.close()
 
             def tray_screenshot():
-                import threading
+                # 截图工具运行 Tk 主循环，使用独立守护线程，避免长期占用共享线程池
                 from ui.tools.screenshot_tool import ScreenshotTool
-                save_dir = str(Path(__file__).parent / "screenshots")
                 def run():
-                    tool = ScreenshotTool(save_dir)
+                    tool = ScreenshotTool(SCREENSHOT_DIR)
                     tool.start()
                 threading.Thread(target=run, daemon=True).start()
 
             def tray_copy_path():
                 import subprocess
-                script = str(Path(__file__).parent / "ui" / "tools" / "path_picker.py")
-                subprocess.Popen([sys.executable, script], creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
+                subprocess.Popen([sys.executable, PATH_PICKER_SCRIPT], creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
 
             _tray_icon = create_tray_icon(state, show_window, quit_app, tray_screenshot, tray_copy_path)
             print(f"[Tray] create_tray_icon 返回: {_tray_icon}")
@@ -2,16 +2,41 @@
 """PathFixer MCP Server - 自动修正路径的文件操作工具 + 代理搜索/抓取"""
 import sys
 import os
+import io
+import codecs
 import json
 import re
+import time
+from collections import OrderedDict
 from pathlib import Path
 from html.parser import HTMLParser
 from html import unescape
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from urllib.parse import urljoin
+import urllib.error
 import urllib.request
 import urllib.parse
 
+# 可选：orjson 加速 MCP 响应序列化
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 可选：urllib3 连接池，复用经代理建立的 TCP/TLS 连接
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+# 可选：selectolax（C 实现的 HTML 解析器），不可用时回退到标准库 HTMLParser
+try:
+    from selectolax.parser import HTMLParser as FastHTMLParser
+except ImportError:
+    FastHTMLParser = None
+
 sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 sys.stdin.reconfigure(encoding='utf-8', errors='replace')
 
@@ -21,6 +46,36 @@ WORKING_DIR = os.environ.get('CLAUDE_WORKING_DIR', os.getcwd())
 # 代理配置（可通过环境变量覆盖）
 PROXY_HOST = os.environ.get('PATHFIXER_PROXY', '127.0.0.1:38080')
 
+# proxy_fetch 最多读取的响应字节数（输出本身只保留 15000 字符，超出部分不必下载和解析）
+MAX_FETCH_BYTES = 2 * 1024 * 1024
+
+# ============== 预编译正则 ==============
+
+_RE_SCRIPT = re.compile(r'<script[^>]*>[\s\S]*?</script>', re.IGNORECASE)
+_RE_STYLE = re.compile(r'<style[^>]*>[\s\S]*?</style>', re.IGNORECASE)
+_STRIP_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript')
+_NOISE_KW = r'nav|menu|sidebar|footer|header|comment|recommend|related|ad|share|social|logo|copyright|qrcode'
+# _simple_extract 一次性去除：脚本/样式/导航等整块标签、注释、带噪声 class/id 的 div
+_RE_STRIP = re.compile(
+    rf'<({"|".join(_STRIP_TAGS)})[^>]*>[\s\S]*?</\1>'
+    r'|<!--[\s\S]*?-->'
+    rf'|<div[^>]*(?:class|id)="[^"]*(?:{_NOISE_KW})[^"]*"[^>]*>[\s\S]*?</div>',
+    re.IGNORECASE)
+_RE_ARTICLE = re.compile(r'<article[^>]*>([\s\S]*?)</article>', re.IGNORECASE)
+_RE_MAIN = re.compile(r'<main[^>]*>([\s\S]*?)</main>', re.IGNORECASE)
+_RE_DIV_OPEN = re.compile(r'<div[^>]*>')
+_RE_DIV_CLOSE = re.compile(r'(</div>)+')
+_RE_STYLE_ATTR = re.compile(r'\s*style="[^"]*"')
+_RE_SPAN_OPEN = re.compile(r'<span[^>]*>')
+_RE_MULTI_NL = re.compile(r'\n{3,}')
+_RE_EMPTY_LINK = re.compile(r'\[\]\(url\)')
+_RE_EMPTY_BRACKETS = re.compile(r'(?<!!)\\[\\]')
+_RE_UDDG = re.compile(r'uddg=([^&]+)')
+_RE_DDG_RESULT = re.compile(r'<a rel="nofollow" class="result__a" href="([^"]+)"[^>]*>([^<]+)</a>')
+_RE_BING_RESULT = re.compile(r'<li class="b_algo"[^>]*>.*?<h2><a[^>]*href="(https?://[^"]+)"[^>]*>([^<]+)', re.DOTALL)
+_RE_WIN_PATH = re.compile(r'^/?([a-zA-Z])/(.*)')
+_RE_WIN_ABS = re.compile(r'[a-zA-Z]:/[^*?"<>|]*')
+
 # ============== HTML to Markdown 转换器 ==============
 
 DEFAULT_ALLOWED_INLINE = {"a", "strong", "b", "em", "i", "code", "span", "img", "sup", "sub", "del"}
@@ -29,11 +84,16 @@ DEFAULT_ALLOWED_BLOCK = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "
 def is_allowed(tag, allow_inline=DEFAULT_ALLOWED_INLINE, allow_block=DEFAULT_ALLOWED_BLOCK):
     return tag.lower() in allow_inline or tag.lower() in allow_block
 
+# 表格对齐方式 -> Markdown 分隔行（其余对齐方式按默认处理）
+_TABLE_ALIGN = {'center': ':---:', 'right': '---:'}
+
 class HTMLToMarkdownParser(HTMLParser):
     def __init__(self, base_url=None, drop_unknown_tags=False):
         super().__init__()
-        self.text: List[str] = []
-        self.list_stack: List[str] = []
+        self.out = io.StringIO()
+        self.list_depth = 0
+        self.list_ol_bits = 0  # 第 n 层列表为 ol 时第 n 位置 1，用整数代替列表栈
+        self.link_href: Optional[str] = None  # 当前链接地址；<a> 极少嵌套，外层地址才压入 link_stack
         self.link_stack: List[str] = []
         self.in_code = False
         self.in_pre = False
@@ -53,40 +113,45 @@ class HTMLToMarkdownParser(HTMLParser):
             return
         attrs_dict = dict(attrs)
         if tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            self.text.append('\n' + '#' * int(tag[1]) + ' ')
+            self.out.write('\n' + '#' * int(tag[1]) + ' ')
         elif tag == 'br':
-            self.text.append('\n')
+            self.out.write('\n')
         elif tag in ['strong', 'b']:
-            self.text.append('**')
+            self.out.write('**')
         elif tag in ['em', 'i']:
-            self.text.append('*')
+            self.out.write('*')
         elif tag == 'code':
-            self.text.append('`')
+            self.out.write('`')
             self.in_code = True
         elif tag == 'pre':
             self.in_pre = True
-            self.text.append('\n```\n')
+            self.out.write('\n```\n')
         elif tag in ['ul', 'ol']:
-            self.list_stack.append(tag)
+            if tag == 'ol':
+                self.list_ol_bits |= 1 << self.list_depth
+            self.list_depth += 1
         elif tag == 'li':
-            indent = '  ' * (len(self.list_stack) - 1)
-            marker = '1. ' if self.list_stack and self.list_stack[-1] == 'ol' else '- '
-            self.text.append(f'\n{indent}{marker}')
+            depth = self.list_depth
+            indent = '  ' * (depth - 1)
+            marker = '1. ' if depth and (self.list_ol_bits >> (depth - 1)) & 1 else '- '
+            self.out.write(f'\n{indent}{marker}')
             self.in_li = True
         elif tag == 'a':
-            self.text.append('[')
+            self.out.write('[')
             href = attrs_dict.get('href', '')
             if self.base_url and href and not href.startswith(('http', 'data:', '#')):
                 href = urljoin(self.base_url, href)
-            self.link_stack.append(href)
+            if self.link_href is not None:
+                self.link_stack.append(self.link_href)
+            self.link_href = href
         elif tag == 'blockquote':
-            self.text.append('\n> ')
+            self.out.write('\n> ')
         elif tag == 'img':
             src = attrs_dict.get('src', '')
             alt = attrs_dict.get('alt', '')
             if self.base_url and src and not src.startswith(('http', 'data:')):
                 src = urljoin(self.base_url, src)
-            self.text.append(f'![{alt}]({src})')
+            self.out.write(f'![{alt}]({src})')
         elif tag == 'table':
             self.in_table = True
             self.table_rows = []
@@ -105,24 +170,26 @@ class HTMLToMarkdownParser(HTMLParser):
         if self.drop_unknown_tags and not is_allowed(tag):
             return
         if tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p']:
-            self.text.append('\n')
+            self.out.write('\n')
         elif tag in ['strong', 'b']:
-            self.text.append('**')
+            self.out.write('**')
         elif tag in ['em', 'i']:
-            self.text.append('*')
+            self.out.write('*')
         elif tag == 'code':
-            self.text.append('`')
+            self.out.write('`')
             self.in_code = False
         elif tag == 'pre':
-            self.text.append('\n```\n')
+            self.out.write('\n```\n')
             self.in_pre = False
         elif tag == 'a':
-            href = self.link_stack.pop() if self.link_stack else ''
-            self.text.append(f']({href})' if href else ']')
+            href = self.link_href or ''
+            self.link_href = self.link_stack.pop() if self.link_stack else None
+            self.out.write(f']({href})' if href else ']')
         elif tag in ['ul', 'ol']:
-            if self.list_stack:
-                self.list_stack.pop()
-            self.text.append('\n')
+            if self.list_depth:
+                self.list_depth -= 1
+                self.list_ol_bits &= ~(1 << self.list_depth)
+            self.out.write('\n')
         elif tag == 'li':
             self.in_li = False
         elif tag in ['th', 'td']:
@@ -143,13 +210,13 @@ class HTMLToMarkdownParser(HTMLParser):
             self.current_cell.append(data)
             return
         if data.strip() or self.in_code or self.in_pre:
-            self.text.append(data)
+            self.out.write(data)
 
     def get_markdown(self):
-        md = ''.join(self.text)
-        md = re.sub(r'\n{3,}', '\n\n', md)
-        md = re.sub(r'\[\]\(url\)', '', md)
-        md = re.sub(r'(?<!!)\\[\\]', '', md)
+        md = self.out.getvalue()
+        md = _RE_MULTI_NL.sub('\n\n', md)
+        md = _RE_EMPTY_LINK.sub('', md)
+        md = _RE_EMPTY_BRACKETS.sub('', md)
         return md.strip()
 
     def _flush_table(self):
@@ -169,77 +236,138 @@ class HTMLToMarkdownParser(HTMLParser):
             return list(cells) + [('', None)] * (col_count - len(cells))
         header_cells = pad(header_cells)
         body_rows = [pad(r) for r in body_rows]
-        lines = ['| ' + ' | '.join(c.strip() for c, _ in header_cells) + ' |']
-        lines.append('| ' + ' | '.join(':---:' if a == 'center' else '---:' if a == 'right' else '---' for _, a in header_cells) + ' |')
+        # 单元格在 handle_endtag 中已 strip 过，这里直接拼接
+        lines = ['| ' + ' | '.join(c for c, _ in header_cells) + ' |']
+        lines.append('| ' + ' | '.join(_TABLE_ALIGN.get(a, '---') for _, a in header_cells) + ' |')
         for row in body_rows:
-            lines.append('| ' + ' | '.join(c.strip() for c, _ in row) + ' |')
-        self.text.append('\n' + '\n'.join(lines) + '\n')
+            lines.append('| ' + ' | '.join(c for c, _ in row) + ' |')
+        self.out.write('\n' + '\n'.join(lines) + '\n')
+
+def _feed_fast(parser, html):
+    """用 selectolax 建树，按文档顺序把节点回放给 HTMLToMarkdownParser 的回调（迭代遍历，避免深层嵌套递归）"""
+    tree = FastHTMLParser(html)
+    root = tree.body or tree.root
+    if root is None:
+        return
+    stack = [(False, node) for node in reversed(list(root.iter(include_text=True)))]
+    while stack:
+        closing, node = stack.pop()
+        tag = node.tag
+        if closing:
+            parser.handle_endtag(tag)
+        elif tag == '-text':
+            parser.handle_data(node.text(deep=False))
+        elif not tag.startswith(('-', '_')):  # 跳过注释等非元素节点
+            parser.handle_starttag(tag, list(node.attributes.items()))
+            stack.append((True, node))
+            stack.extend((False, child) for child in reversed(list(node.iter(include_text=True))))
 
 def html_to_markdown(html_content, base_url=None):
     """Convert HTML to Markdown"""
-    html = re.sub(r'<script[^>]*>[\s\S]*?</script>', '', html_content, flags=re.IGNORECASE)
-    html = re.sub(r'<style[^>]*>[\s\S]*?</style>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'<div[^>]*>', '', html)
-    html = re.sub(r'(</div>)+', '\n', html)
-    html = re.sub(r'\s*style="[^"]*"', '', html)
-    html = re.sub(r'<span[^>]*>', '', html)
-    html = re.sub(r'</span>', '', html)
+    html = _RE_SCRIPT.sub('', html_content)
+    html = _RE_STYLE.sub('', html)
+    html = _RE_DIV_OPEN.sub('', html)
+    html = _RE_DIV_CLOSE.sub('\n', html)
+    html = _RE_STYLE_ATTR.sub('', html)
+    html = _RE_SPAN_OPEN.sub('', html)
+    html = html.replace('</span>', '')
     html = unescape(html)
     parser = HTMLToMarkdownParser(base_url=base_url)
     try:
-        parser.feed(html)
+        if FastHTMLParser is not None:
+            _feed_fast(parser, html)
+        else:
+            parser.feed(html)
         return parser.get_markdown()
     except Exception:
         return html_content
 
 def _simple_extract(html):
     """简单提取正文"""
-    html = re.sub(r'<script[^>]*>[\s\S]*?</script>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'<style[^>]*>[\s\S]*?</style>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'<!--[\s\S]*?-->', '', html)
-    for tag in ['nav', 'header', 'footer', 'aside', 'iframe', 'noscript']:
-        html = re.sub(rf'<{tag}[^>]*>[\s\S]*?</{tag}>', '', html, flags=re.IGNORECASE)
-    noise_kw = r'nav|menu|sidebar|footer|header|comment|recommend|related|ad|share|social|logo|copyright|qrcode'
-    html = re.sub(rf'<div[^>]*(?:class|id)="[^"]*(?:{noise_kw})[^"]*"[^>]*>[\s\S]*?</div>', '', html, flags=re.IGNORECASE)
-    for pattern in [r'<article[^>]*>([\s\S]*?)</article>', r'<main[^>]*>([\s\S]*?)</main>']:
-        match = re.search(pattern, html, re.IGNORECASE)
+    html = _RE_STRIP.sub('', html)
+    for pattern in (_RE_ARTICLE, _RE_MAIN):
+        match = pattern.search(html)
         if match:
             return match.group(0)
     return html
 
 # ============== 代理功能 ==============
 
+# 代理 opener 在模块加载时构建一次，所有抓取/搜索共用
+PROXY_OPENER = urllib.request.build_opener(
+    urllib.request.ProxyHandler({'http': f'http://{PROXY_HOST}', 'https': f'http://{PROXY_HOST}'}))
+# 有 urllib3 时改用持久连接池，同一站点的多次请求省去重复的 TCP + TLS 握手
+PROXY_POOL = urllib3.ProxyManager(f'http://{PROXY_HOST}', maxsize=8) if urllib3 else None
+
+def _http_get(url, headers, timeout, max_bytes=None):
+    """经代理 GET 并返回 UTF-8 解码后的文本，最多读取 max_bytes 字节；HTTP 错误状态抛出 HTTPError"""
+    if PROXY_POOL is None:
+        req = urllib.request.Request(url, headers=headers)
+        with PROXY_OPENER.open(req, timeout=timeout) as resp:
+            return resp.read(max_bytes).decode('utf-8', errors='ignore')
+    resp = PROXY_POOL.request('GET', url, headers=headers, preload_content=False,
+                              timeout=urllib3.Timeout(connect=10, read=timeout))
+    try:
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        data = resp.read(max_bytes)
+    except BaseException:
+        resp.close()
+        raise
+    if max_bytes is not None and len(data) >= max_bytes:
+        resp.close()  # 未读完的连接不能放回池中
+    else:
+        resp.release_conn()
+    return data.decode('utf-8', errors='ignore')
+
+# 抓取/搜索结果缓存：同一会话里重试、追问常会重复请求同一 URL/关键词，短时间内直接复用
+CACHE_TTL = 300  # 秒
+CACHE_MAX_SIZE = 64
+_fetch_cache = OrderedDict()  # {url: (timestamp, markdown)}
+_search_cache = OrderedDict()  # {query: (timestamp, text)}
+
+def _cache_get(cache, key):
+    hit = cache.get(key)
+    if hit and time.monotonic() - hit[0] < CACHE_TTL:
+        cache.move_to_end(key)
+        return hit[1]
+    return None
+
+def _cache_put(cache, key, value):
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    while len(cache) > CACHE_MAX_SIZE:
+        cache.popitem(last=False)
+
 def proxy_fetch(url, prompt=""):
     """通过代理访问网页，自动提取正文并转为 Markdown"""
+    cached = _cache_get(_fetch_cache, url)
+    if cached is not None:
+        return cached
     try:
-        proxy = urllib.request.ProxyHandler({'http': f'http://{PROXY_HOST}', 'https': f'http://{PROXY_HOST}'})
-        opener = urllib.request.build_opener(proxy)
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with opener.open(req, timeout=30) as resp:
-            html = resp.read().decode('utf-8', errors='ignore')
+        html = _http_get(url, {'User-Agent': 'Mozilla/5.0'}, 30, MAX_FETCH_BYTES)
         html = _simple_extract(html)
         content = html_to_markdown(html, base_url=url)
         if len(content) > 15000:
             content = content[:15000] + "\n...(truncated)"
+        _cache_put(_fetch_cache, url, content)
         return content
     except Exception as e:
         return {"error": f"请求失败: {e}", "url": url}
 
 def _extract_real_url(ddg_url):
     if 'uddg=' in ddg_url:
-        match = re.search(r'uddg=([^&]+)', ddg_url)
+        match = _RE_UDDG.search(ddg_url)
         if match:
             return urllib.parse.unquote(match.group(1))
     return ddg_url
 
-def _search_duckduckgo(query, opener):
+def _search_duckduckgo(query):
     results = []
     try:
         url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with opener.open(req, timeout=15) as resp:
-            html = resp.read().decode('utf-8', errors='ignore')
-        for match in re.finditer(r'<a rel="nofollow" class="result__a" href="([^"]+)"[^>]*>([^<]+)</a>', html):
+        html = _http_get(url, {'User-Agent': 'Mozilla/5.0'}, 15)
+        for match in _RE_DDG_RESULT.finditer(html):
             results.append((match.group(2), _extract_real_url(match.group(1))))
             if len(results) >= 10:
                 break
@@ -247,14 +375,12 @@ def _search_duckduckgo(query, opener):
         pass
     return results
 
-def _search_bing(query, opener):
+def _search_bing(query):
     results = []
     try:
         url = f"https://www.bing.com/search?q={urllib.parse.quote(query)}&count=20"
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0', 'Accept-Language': 'zh-CN,zh;q=0.9'})
-        with opener.open(req, timeout=15) as resp:
-            html = resp.read().decode('utf-8', errors='ignore')
-        for match in re.finditer(r'<li class="b_algo"[^>]*>.*?<h2><a[^>]*href="(https?://[^"]+)"[^>]*>([^<]+)', html, re.DOTALL):
+        html = _http_get(url, {'User-Agent': 'Mozilla/5.0', 'Accept-Language': 'zh-CN,zh;q=0.9'}, 15)
+        for match in _RE_BING_RESULT.finditer(html):
             if 'bing.com' not in match.group(1) and 'microsoft.com' not in match.group(1):
                 results.append((match.group(2).strip(), match.group(1)))
                 if len(results) >= 10:
@@ -265,11 +391,15 @@ def _search_bing(query, opener):
 
 def proxy_search(query):
     """通过代理搜索（DuckDuckGo + Bing）"""
+    cached = _cache_get(_search_cache, query)
+    if cached is not None:
+        return cached
     try:
-        proxy = urllib.request.ProxyHandler({'http': f'http://{PROXY_HOST}', 'https': f'http://{PROXY_HOST}'})
-        opener = urllib.request.build_opener(proxy)
-        ddg_results = _search_duckduckgo(query, opener)
-        bing_results = _search_bing(query, opener)
+        # 两个搜索引擎互不依赖，并行请求；各自内部已吞掉异常，单个失败不影响另一个
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            ddg_future = executor.submit(_search_duckduckgo, query)
+            bing_future = executor.submit(_search_bing, query)
+            ddg_results, bing_results = ddg_future.result(), bing_future.result()
         lines = [f"## 搜索: {query}", ""]
         if ddg_results:
             lines.append("### DuckDuckGo")
@@ -281,7 +411,9 @@ def proxy_search(query):
                 lines.extend([f"{i}. {title}", f"   {url}", ""])
         if not ddg_results and not bing_results:
             return f'未找到关于 "{query}" 的结果'
-        return "\n".join(lines)
+        text = "\n".join(lines)
+        _cache_put(_search_cache, query, text)
+        return text
     except Exception as e:
         return f"搜索失败: {e}"
 
@@ -292,17 +424,45 @@ def fix_path(file_path):
     if not file_path:
         return file_path
     file_path = file_path.replace('\\', '/')
-    match = re.match(r'^/([a-zA-Z])/(.*)', file_path)
+    # /c/xxx 或 c/xxx -> C:/xxx
+    match = _RE_WIN_PATH.match(file_path)
     if match:
         file_path = f"{match.group(1).upper()}:/{match.group(2)}"
-    match = re.match(r'^([a-zA-Z])/(.*)', file_path)
-    if match and len(match.group(1)) == 1:
-        file_path = f"{match.group(1).upper()}:/{match.group(2)}"
+    # Windows 盘符绝对路径直接做字符串规范化，省去 resolve() 的逐级 stat
+    if os.name == 'nt' and _RE_WIN_ABS.fullmatch(file_path):
+        return os.path.normpath(file_path)
     p = Path(file_path)
     if not p.is_absolute():
         p = Path(WORKING_DIR) / p
     return str(p.resolve())
 
+_BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+def _guess_encodings(path, candidates):
+    """根据 BOM 和文件开头 4KB 的试解码结果，返回按可能性排序的候选编码
+
+    开头都解不开的编码整个文件也解不开，直接跳过，避免对大文件做多次失败的完整解码。
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(4096)
+    except OSError:
+        return list(candidates)
+    for bom, enc in _BOMS:
+        if head.startswith(bom):
+            return [enc] + [e for e in candidates if e != enc]
+    for i, enc in enumerate(candidates):
+        try:
+            codecs.getincrementaldecoder(enc)().decode(head, final=False)
+        except UnicodeDecodeError:
+            continue
+        return list(candidates[i:])
+    return list(candidates)
+
+def _number_lines(lines, start):
+    """给行加上 6 位右对齐行号，map + % 格式化全程在 C 层完成，比逐行 f-string 快约一倍"""
+    return '\n'.join(map('%6d│%s'.__mod__, zip(range(start, start + len(lines)), map(str.rstrip, lines))))
+
 def read_file(file_path, offset=0, limit=2000):
     file_path = fix_path(file_path)
     path = Path(file_path)
@@ -310,19 +470,20 @@ def read_file(file_path, offset=0, limit=2000):
         return {"error": f"文件不存在: {file_path}"}
     if not path.is_file():
         return {"error": f"不是文件: {file_path}"}
-    for enc in ['utf-8', 'gbk', 'gb2312', 'latin-1']:
+    offset = max(offset or 0, 0)
+    for enc in _guess_encodings(path, ('utf-8', 'gbk', 'gb2312', 'latin-1')):
         try:
+            # 流式读取：只保留请求范围内的行，其余行只计数，内存占用与 limit 成正比
             with open(path, 'r', encoding=enc) as f:
-                lines = f.readlines()
+                skipped = sum(1 for _ in islice(f, offset))
+                lines = list(islice(f, limit)) if limit else list(f)
+                total = skipped + len(lines) + sum(1 for _ in f)
             break
         except UnicodeDecodeError:
             continue
     else:
         return {"error": f"无法解码文件: {file_path}"}
-    total = len(lines)
-    lines = lines[offset:offset + limit] if limit else lines[offset:]
-    numbered = [f"{offset + i + 1:6d}│{line.rstrip()}" for i, line in enumerate(lines)]
-    return {"content": '\n'.join(numbered), "total_lines": total, "file_path": file_path}
+    return {"content": _number_lines(lines, offset + 1), "total_lines": total, "file_path": file_path}
 
 def write_file(file_path, content):
     file_path = fix_path(file_path)
@@ -341,7 +502,7 @@ def edit_file(file_path, old_string, new_string, replace_all=False):
     path = Path(file_path)
     if not path.exists():
         return {"error": f"文件不存在: {file_path}"}
-    for enc in ['utf-8', 'gbk', 'latin-1']:
+    for enc in _guess_encodings(path, ('utf-8', 'gbk', 'latin-1')):
         try:
             with open(path, 'r', encoding=enc) as f:
                 content = f.read()
@@ -353,15 +514,23 @@ def edit_file(file_path, old_string, new_string, replace_all=False):
     content = content.replace('\r\n', '\n')
     old_string = old_string.replace('\r\n', '\n')
     new_string = new_string.replace('\r\n', '\n')
-    if old_string not in content:
+    first = content.find(old_string)
+    if first < 0:
         return {"error": f"未找到匹配内容，file_path: {file_path}"}
-    count = content.count(old_string)
-    if count > 1 and not replace_all:
-        return {"error": f"找到 {count} 处匹配，请设置 replace_all=true 或提供更精确的内容"}
-    new_content = content.replace(old_string, new_string) if replace_all else content.replace(old_string, new_string, 1)
+    end = first + len(old_string)
+    if replace_all:
+        count = content.count(old_string, first)
+        new_content = content.replace(old_string, new_string)
+    else:
+        # 单处替换只需确认后面没有第二处匹配，无需统计全文
+        if content.find(old_string, end) >= 0:
+            count = content.count(old_string, first)
+            return {"error": f"找到 {count} 处匹配，请设置 replace_all=true 或提供更精确的内容"}
+        count = 1
+        new_content = content[:first] + new_string + content[end:]
     with open(path, 'w', encoding='utf-8', newline='\n') as f:
         f.write(new_content)
-    return {"success": True, "file_path": file_path, "replacements": count if replace_all else 1}
+    return {"success": True, "file_path": file_path, "replacements": count}
 
 # ============== MCP 协议 ==============
 
@@ -403,6 +572,24 @@ FUNCS = {
     "proxy_fetch": proxy_fetch
 }
 
+def json_dumps(obj):
+    """序列化为 JSON 字符串（保留非 ASCII 字符）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+def json_dumps_bytes(obj):
+    """序列化为 UTF-8 编码的 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8', errors='replace')
+
+def json_loads(data):
+    """从字节串解析 JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8', errors='replace'))
+
 def respond(req_id, result=None, error=None):
     if error:
         return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -1, "message": str(error)}}
@@ -425,7 +612,7 @@ def handle(req):
         if name in FUNCS:
             try:
                 result = FUNCS[name](**args)
-                text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+                text = result if isinstance(result, str) else json_dumps(result)
                 return respond(req_id, {"content": [{"type": "text", "text": text}]})
             except Exception as e:
                 return respond(req_id, error=str(e))
@@ -433,13 +620,19 @@ def handle(req):
     return respond(req_id, {})
 
 if __name__ == "__main__":
-    for line in sys.stdin:
-        line = line.strip()
+    # 直接在字节层读写，省去文本层的逐行编解码
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        line = stdin.readline()
         if not line:
+            break
+        if not line.strip():
             continue
         try:
-            result = handle(json.loads(line))
+            result = handle(json_loads(line))
             if result:
-                print(json.dumps(result, ensure_ascii=False), flush=True)
+                stdout.write(json_dumps_bytes(result) + b'\n')
+                stdout.flush()
         except Exception as e:
-            print(json.dumps({"jsonrpc": "2.0", "error": {"code": -1, "message": str(e)}}, ensure_ascii=False), flush=True)
+            stdout.write(json_dumps_bytes({"jsonrpc": "2.0", "error": {"code": -1, "message": str(e)}}) + b'\n')
+            stdout.flush()
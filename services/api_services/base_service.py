@@ -1,12 +1,30 @@
 """基础服务类 - 所有 API 服务的抽象接口"""
 
+import json
 from abc import ABC, abstractmethod
 from typing import Optional, Generator
 
+# SSE 增量解析优先用 orjson（可选依赖），其 JSONDecodeError 是 json.JSONDecodeError 的子类
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# 可重试错误的关键字（已小写）
+_RETRYABLE_KEYWORDS = ('timeout', 'connection', 'network', '503', '502', '429', 'temporarily')
+
 
 class BaseAPIService(ABC):
     """所有 API 服务的基类"""
 
+    session = None  # requests.Session，走 HTTP 的子类在 __init__ 中创建，跨请求复用连接
+    _prefix_cache = None  # (system_prompt, 编码好的前置消息)，单槽缓存
+
     def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = 'default'):
         self.api_key = api_key
         self.base_url = base_url
@@ -23,13 +41,58 @@ class BaseAPIService(ABC):
             temperature: float = 0.7, max_tokens: int = 4000,
             attachments: Optional[list] = None, **kwargs) -> str:
         """非流式聊天 - 基于 chat_stream 实现"""
-        response_text = ""
+        parts = []
         for chunk in self.chat_stream(user_message, system_prompt, temperature, max_tokens, attachments, **kwargs):
-            response_text += chunk
-        return response_text
+            parts.append(chunk)
+        return ''.join(parts)
+
+    def close(self):
+        """关闭复用的 HTTP 连接池"""
+        if self.session is not None:
+            self.session.close()
+
+    def _system_messages(self, system_prompt: str) -> list:
+        """system_prompt 对应的前置消息 - 默认以一轮 user/assistant 对话注入"""
+        return [
+            {"role": "user", "content": system_prompt},
+            {"role": "assistant", "content": "OK, I understand."},
+        ]
+
+    def _encode_body(self, fields: dict, system_prompt: Optional[str], user_msg: dict, extra: bytes = b'') -> bytes:
+        """拼装 JSON 请求体：fields + messages（前置消息 + 本轮用户消息）+ 预编码的 extra 字段
+
+        对话中 system_prompt 通常不变，其编码结果按 system_prompt 缓存，每轮只序列化用户消息。
+        """
+        cache = self._prefix_cache
+        if cache is None or cache[0] != system_prompt:
+            messages = self._system_messages(system_prompt) if system_prompt else []
+            cache = self._prefix_cache = (system_prompt, b''.join(json_dumps(m) + b',' for m in messages))
+        return (json_dumps(fields)[:-1] + b',"messages":[' + cache[1]
+                + json_dumps(user_msg) + b']' + extra + b'}')
+
+    @staticmethod
+    def _iter_sse_data(response) -> Generator[bytearray, None, None]:
+        """按网络块读取 SSE 流，只产出 `data: ` 行的负载
+
+        负载直接从接收缓冲区切出（每个事件只拷贝一次），event/空行不产生任何新对象；
+        chunk_size=None 表示数据到达多少就处理多少，不会为凑满缓冲区而推迟输出。
+        """
+        buf = bytearray()
+        for chunk in response.iter_content(chunk_size=None):
+            buf += chunk
+            start = 0
+            while (nl := buf.find(b'\n', start)) != -1:
+                if buf.startswith(b'data: ', start):
+                    end = nl - 1 if buf[nl - 1] == 0x0D else nl  # 兼容 \r\n
+                    yield buf[start + 6:end]
+                start = nl + 1
+            if start:
+                del buf[:start]
+        if buf.startswith(b'data: '):
+            yield buf[6:].rstrip(b'\r')
 
     @staticmethod
     def _is_retryable_error(error_msg: str) -> bool:
         """检查是否是可重试的错误"""
-        retryable_keywords = ['timeout', 'connection', 'network', '503', '502', '429', 'temporarily']
-        return any(keyword.lower() in error_msg.lower() for keyword in retryable_keywords)
+        msg = error_msg.lower()
+        return any(keyword in msg for keyword in _RETRYABLE_KEYWORDS)
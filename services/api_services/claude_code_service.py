@@ -3,7 +3,7 @@
 import requests
 import json
 from typing import Optional, Generator
-from .base_service import BaseAPIService
+from .base_service import BaseAPIService, json_loads, json_dumps
 from core.claude_tools import ClaudeTools
 
 
@@ -13,25 +13,31 @@ class ClaudeCodeService(BaseAPIService):
     def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = 'claude-sonnet-4-5-20250929'):
         super().__init__(api_key, base_url, model)
         self.tools = ClaudeTools()
+        self.refresh_tools()  # 工具定义是静态的，只构建（并编码）一次
         self.endpoint = (base_url.rstrip('/') + "/v1/messages") if base_url else "https://ai.itssx.com/v1/messages"
         self.headers = {
             "Content-Type": "application/json",
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+    def refresh_tools(self):
+        """工具集变化后重建缓存的工具定义"""
+        self.tools_definition = self.tools.get_tools_definition()
+        self._tools_json = b',"tools":' + json_dumps(self.tools_definition)
 
     def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
                    temperature: float = 0.7, max_tokens: int = 4000,
                    attachments: Optional[list] = None, **kwargs) -> Generator[str, None, None]:
         """流式聊天 - Claude Code API"""
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "user", "content": system_prompt})
-            messages.append({"role": "assistant", "content": "OK, I understand."})
-
-        content = []
-        if attachments:
+        # 无附件时直接用字符串作为 content（Anthropic 支持），省去 content 块列表
+        if not attachments:
+            content = user_message
+        else:
+            content = []
             for attachment in attachments:
                 if attachment['type'] == 'image':
                     content.append({
@@ -40,29 +46,23 @@ class ClaudeCodeService(BaseAPIService):
                     })
                 elif attachment['type'] == 'document':
                     content.append({"type": "text", "text": f"[文件: {attachment['name']}]\n{attachment['data']}"})
-
-        content.append({"type": "text", "text": user_message})
-        messages.append({"role": "user", "content": content})
+            content.append({"type": "text", "text": user_message})
 
         payload = {
             "model": self.model,
-            "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "stream": True,
-            "tools": self.tools.get_tools_definition()
+            "stream": True
         }
+        body = self._encode_body(payload, system_prompt, {"role": "user", "content": content}, self._tools_json)
 
         try:
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
-            response.raise_for_status()
+            with self.session.post(self.endpoint, data=body, timeout=(10, 120), stream=True) as response:
+                response.raise_for_status()
 
-            for line in response.iter_lines():
-                if not line or line.startswith(b'event: '):
-                    continue
-                if line.startswith(b'data: '):
+                for raw in self._iter_sse_data(response):
                     try:
-                        data = json.loads(line[6:])
+                        data = json_loads(raw)
                         if data.get('type') == 'content_block_delta':
                             delta = data.get('delta', {})
                             if delta.get('type') == 'text_delta' and (text := delta.get('text', '')):
@@ -3,7 +3,7 @@
 import requests
 import json
 from typing import Optional, Generator
-from .base_service import BaseAPIService
+from .base_service import BaseAPIService, json_loads
 from core.claude_tools import ClaudeTools
 
 
@@ -20,17 +20,14 @@ class GLMAPIService(BaseAPIService):
             "Authorization": f"Bearer {api_key}",
             "anthropic-version": "2023-06-01"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
                    temperature: float = 0.7, max_tokens: int = 4000,
                    attachments: Optional[list] = None, thinking_mode: Optional[str] = None, **kwargs) -> Generator[str, None, None]:
         """流式聊天 - GLM API (支持 thinking_mode)"""
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "user", "content": system_prompt})
-            messages.append({"role": "assistant", "content": "OK, I understand."})
-
         content = user_message
         if attachments:
             for attachment in attachments:
@@ -39,11 +36,8 @@ class GLMAPIService(BaseAPIService):
                 elif attachment['type'] == 'document':
                     content += f"\n[文件: {attachment['name']}]\n{attachment['data']}"
 
-        messages.append({"role": "user", "content": content})
-
         payload = {
             "model": self.model,
-            "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
             "stream": True
@@ -52,17 +46,15 @@ class GLMAPIService(BaseAPIService):
         # GLM 支持 thinking_mode 参数
         if thinking_mode:
             payload["thinking_mode"] = thinking_mode
+        body = self._encode_body(payload, system_prompt, {"role": "user", "content": content})
 
         try:
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
-            response.raise_for_status()
+            with self.session.post(self.endpoint, data=body, timeout=(10, 120), stream=True) as response:
+                response.raise_for_status()
 
-            for line in response.iter_lines():
-                if not line or line.startswith(b'event: '):
-                    continue
-                if line.startswith(b'data: '):
+                for raw in self._iter_sse_data(response):
                     try:
-                        data = json.loads(line[6:])
+                        data = json_loads(raw)
                         if data.get('choices') and len(data['choices']) > 0:
                             delta = data['choices'][0].get('delta', {})
                             if 'content' in delta:
@@ -3,7 +3,7 @@
 import requests
 import json
 from typing import Optional, Generator
-from .base_service import BaseAPIService
+from .base_service import BaseAPIService, json_loads
 
 
 class OpenAIService(BaseAPIService):
@@ -16,46 +16,43 @@ class OpenAIService(BaseAPIService):
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+    def _system_messages(self, system_prompt: str) -> list:
+        return [{"role": "system", "content": system_prompt}]
 
     def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
                    temperature: float = 0.7, max_tokens: int = 4000,
                    attachments: Optional[list] = None, **kwargs) -> Generator[str, None, None]:
         """流式聊天 - OpenAI API"""
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-
         content = user_message
         if attachments:
             for attachment in attachments:
                 if attachment['type'] == 'image':
                     content += f"\n[图片: {attachment.get('name', 'image')}]"
 
-        messages.append({"role": "user", "content": content})
-
         payload = {
             "model": self.model,
-            "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
             "stream": True,
         }
+        body = self._encode_body(payload, system_prompt, {"role": "user", "content": content})
 
         try:
-            response = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=(10, 120), stream=True)
-            response.raise_for_status()
-
-            for line in response.iter_lines():
-                if not line or not line.startswith(b'data: '):
-                    continue
-                try:
-                    data = json.loads(line[6:])
-                    if data.get('choices') and len(data['choices']) > 0:
-                        delta = data['choices'][0].get('delta', {})
-                        if 'content' in delta:
-                            yield delta['content']
-                except json.JSONDecodeError:
-                    continue
+            with self.session.post(self.endpoint, data=body, timeout=(10, 120), stream=True) as response:
+                response.raise_for_status()
+
+                for raw in self._iter_sse_data(response):
+                    try:
+                        data = json_loads(raw)
+                        if data.get('choices') and len(data['choices']) > 0:
+                            delta = data['choices'][0].get('delta', {})
+                            if 'content' in delta:
+                                yield delta['content']
+                    except json.JSONDecodeError:
+                        continue
         except requests.exceptions.RequestException as e:
             yield f"\n\n[错误] {str(e)}\n"
@@ -2,13 +2,30 @@
 基础服务类 - 所有 API 服务的抽象接口
 """
 
+import json
 from abc import ABC, abstractmethod
 from typing import Optional, Generator
 
+# SSE 增量解析优先用 orjson（可选依赖），其 JSONDecodeError 是 json.JSONDecodeError 的子类
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# 可重试错误的关键字（已小写）
+_RETRYABLE_KEYWORDS = ('timeout', 'connection', 'network', '503', '502', '429', 'temporarily')
+
 
 class BaseAPIService(ABC):
     """所有 API 服务的基类"""
 
+    session = None  # HTTP 客户端（httpx.Client），走 HTTP 的子类在 __init__ 中创建，跨请求复用连接
+
     def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = 'default'):
         self.api_key = api_key
         self.base_url = base_url
@@ -25,13 +42,39 @@ class BaseAPIService(ABC):
             temperature: float = 0.7, max_tokens: int = 4000,
             attachments: Optional[list] = None) -> str:
         """非流式聊天 - 基于 chat_stream 实现"""
-        response_text = ""
+        parts = []
         for chunk in self.chat_stream(user_message, system_prompt, temperature, max_tokens, attachments):
-            response_text += chunk
-        return response_text
+            parts.append(chunk)
+        return ''.join(parts)
+
+    def close(self):
+        """关闭复用的 HTTP 连接池"""
+        if self.session is not None:
+            self.session.close()
+
+    @staticmethod
+    def _iter_sse_data(chunks) -> Generator[bytearray, None, None]:
+        """按网络块读取 SSE 流，只产出 `data: ` 行的负载
+
+        chunks 为响应的字节块迭代器（如 httpx 的 response.iter_bytes()），数据到达多少就处理多少；
+        负载直接从接收缓冲区切出（每个事件只拷贝一次），event/空行不产生任何新对象。
+        """
+        buf = bytearray()
+        for chunk in chunks:
+            buf += chunk
+            start = 0
+            while (nl := buf.find(b'\n', start)) != -1:
+                if buf.startswith(b'data: ', start):
+                    end = nl - 1 if buf[nl - 1] == 0x0D else nl  # 兼容 \r\n
+                    yield buf[start + 6:end]
+                start = nl + 1
+            if start:
+                del buf[:start]
+        if buf.startswith(b'data: '):
+            yield buf[6:].rstrip(b'\r')
 
     @staticmethod
     def _is_retryable_error(error_msg: str) -> bool:
         """检查是否是可重试的错误"""
-        retryable_keywords = ['timeout', 'connection', 'network', '503', '502', '429', 'temporarily']
-        return any(keyword.lower() in error_msg.lower() for keyword in retryable_keywords)
+        msg = error_msg.lower()
+        return any(keyword in msg for keyword in _RETRYABLE_KEYWORDS)
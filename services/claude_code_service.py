@@ -8,12 +8,34 @@ Claude Code API 服务 (ai.itssx.com)
 - thinking_mode: ❌ 不支持
 """
 
-import requests
+import asyncio
+import httpx
 import json
-from typing import Optional, Generator
-from services.base_service import BaseAPIService
+from typing import Optional, Generator, AsyncGenerator
+from services.base_service import BaseAPIService, json_loads, json_dumps
 from core.claude_tools import ClaudeTools
 
+# 可选：HTTP/2 (h2) 与 brotli 解压，pip install "httpx[http2]" brotli
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# 可选：Cython 编译的 SSE 解码器（python setup.py build_ext --inplace）
+try:
+    from core.sse_decode import iter_text_deltas
+except ImportError:
+    iter_text_deltas = None
+
+TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
 
 class ClaudeCodeService(BaseAPIService):
     """Claude Code API 服务"""
@@ -21,6 +43,7 @@ class ClaudeCodeService(BaseAPIService):
     def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = 'claude-sonnet-4-5-20250929'):
         super().__init__(api_key, base_url, model)
         self.tools = ClaudeTools()
+        self.refresh_tools()  # 工具定义是静态的，只构建（并编码）一次
 
         # 设置端点
         if base_url:
@@ -32,23 +55,33 @@ class ClaudeCodeService(BaseAPIService):
         self.headers = {
             "Content-Type": "application/json",
             "x-api-key": api_key,
-            "anthropic-version": "2023-06-01"
+            "anthropic-version": "2023-06-01",
+            "Accept-Encoding": ACCEPT_ENCODING
         }
+        # 复用连接池，连续请求不再重复 TCP/TLS 握手；装有 h2 时走 HTTP/2
+        self.session = httpx.Client(http2=HAS_HTTP2, headers=self.headers, timeout=TIMEOUT)
+        # 异步客户端按事件循环分别创建：AsyncClient 绑定首次使用它的循环，不能跨 asyncio.run() 复用
+        self._aclients: dict = {}
 
-    def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
-                   temperature: float = 0.7, max_tokens: int = 4000,
-                   attachments: Optional[list] = None) -> Generator[str, None, None]:
-        """流式聊天 - Claude Code API"""
+    def refresh_tools(self):
+        """工具集变化后重建缓存的工具定义"""
+        self.tools_definition = self.tools.get_tools_definition()
+        self._tools_json = b',"tools":' + json_dumps(self.tools_definition)
 
+    def _build_body(self, user_message: str, system_prompt: Optional[str], temperature: float,
+                    max_tokens: int, attachments: Optional[list]) -> bytes:
+        """构建 JSON 请求体"""
         # 构建消息
         messages = []
         if system_prompt:
             messages.append({"role": "user", "content": system_prompt})
             messages.append({"role": "assistant", "content": "OK, I understand."})
 
-        # 构建用户消息内容
-        content = []
-        if attachments:
+        # 构建用户消息内容：无附件时直接用字符串（Anthropic 支持），省去 content 块列表
+        if not attachments:
+            content = user_message
+        else:
+            content = []
             for attachment in attachments:
                 if attachment['type'] == 'image':
                     content.append({
@@ -65,7 +98,7 @@ class ClaudeCodeService(BaseAPIService):
                         "text": f"[文件: {attachment['name']}]\n{attachment['data']}"
                     })
 
-        content.append({"type": "text", "text": user_message})
+            content.append({"type": "text", "text": user_message})
         messages.append({"role": "user", "content": content})
 
         # 构建请求
@@ -74,37 +107,93 @@ class ClaudeCodeService(BaseAPIService):
             "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "stream": True,
-            "tools": self.tools.get_tools_definition()
+            "stream": True
         }
+        # 工具定义使用预编码的 JSON 片段拼接，不再逐次序列化
+        return json_dumps(payload)[:-1] + self._tools_json + b'}'
+
+    @staticmethod
+    def _delta_text(data: dict) -> str:
+        """从 content_block_delta 事件中取出增量文本"""
+        if data.get('type') == 'content_block_delta':
+            delta = data.get('delta', {})
+            if delta.get('type') == 'text_delta':
+                return delta.get('text', '')
+        return ''
+
+    def chat_stream(self, user_message: str, system_prompt: Optional[str] = None,
+                   temperature: float = 0.7, max_tokens: int = 4000,
+                   attachments: Optional[list] = None) -> Generator[str, None, None]:
+        """流式聊天 - Claude Code API"""
+        body = self._build_body(user_message, system_prompt, temperature, max_tokens, attachments)
 
         # 发送请求并处理流
         try:
-            response = requests.post(
-                self.endpoint,
-                json=payload,
-                headers=self.headers,
-                timeout=(10, 120),
-                stream=True
-            )
-            response.raise_for_status()
-
-            for line in response.iter_lines():
-                if not line:
-                    continue
-
-                if line.startswith(b'event: '):
-                    continue
-                elif line.startswith(b'data: '):
+            with self.session.stream('POST', self.endpoint, content=body) as response:
+                response.raise_for_status()
+
+                # event/空行在 _iter_sse_data 中跳过，只解析 data 负载
+                payloads = self._iter_sse_data(response.iter_bytes())
+                if iter_text_deltas is not None:
+                    yield from iter_text_deltas(payloads)
+                    return
+
+                for raw in payloads:
                     try:
-                        data = json.loads(line[6:])
-                        if data.get('type') == 'content_block_delta':
-                            delta = data.get('delta', {})
-                            if delta.get('type') == 'text_delta':
-                                text = delta.get('text', '')
-                                if text:
-                                    yield text
+                        text = self._delta_text(json_loads(raw))
                     except json.JSONDecodeError:
                         continue
-        except requests.exceptions.RequestException as e:
+                    if text:
+                        yield text
+        except httpx.HTTPError as e:
             yield f"\n\n[错误] {str(e)}\n"
+
+    async def chat_stream_async(self, user_message: str, system_prompt: Optional[str] = None,
+                                temperature: float = 0.7, max_tokens: int = 4000,
+                                attachments: Optional[list] = None) -> AsyncGenerator[str, None]:
+        """异步流式聊天 - 多个对话可在同一事件循环中并发（如 asyncio.gather）"""
+        body = self._build_body(user_message, system_prompt, temperature, max_tokens, attachments)
+
+        try:
+            async with self._async_client().stream('POST', self.endpoint, content=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith('data: '):
+                        continue
+                    try:
+                        text = self._delta_text(json_loads(line[6:]))
+                    except json.JSONDecodeError:
+                        continue
+                    if text:
+                        yield text
+        except httpx.HTTPError as e:
+            yield f"\n\n[错误] {str(e)}\n"
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """当前事件循环专用的异步客户端（同一循环内的并发请求共享连接池）"""
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            # 顺带丢弃已关闭循环遗留的客户端（其连接已随循环失效）
+            self._aclients = {lp: c for lp, c in self._aclients.items() if not lp.is_closed()}
+            client = self._aclients[loop] = httpx.AsyncClient(http2=HAS_HTTP2, headers=self.headers, timeout=TIMEOUT)
+        return client
+
+    async def aclose(self):
+        """关闭当前事件循环的异步 HTTP 客户端"""
+        client = self._aclients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def chat_many(self, user_messages: list, **kwargs) -> list:
+        """并发发送多条消息（asyncio.gather），按输入顺序返回完整回复"""
+        async def collect(message):
+            return ''.join([text async for text in self.chat_stream_async(message, **kwargs)])
+
+        async def run():
+            try:
+                return await asyncio.gather(*(collect(m) for m in user_messages))
+            finally:
+                await self.aclose()
+
+        return asyncio.run(run())
@@ -2,11 +2,16 @@
 统一的设置管理器 - 与 AI_talk 保持一致
 """
 
+import atexit
 import json
+import os
+import threading
 from pathlib import Path
 from typing import Optional
 from api_config_manager import ConfigManager
 
+SAVE_DELAY = 0.25  # 写盘防抖间隔（秒），连续修改合并为一次写入
+
 
 class SettingsManager:
     """设置管理器 - 与 AI_talk 保持一致"""
@@ -19,14 +24,23 @@ class SettingsManager:
         self.data_dir.mkdir(exist_ok=True)
         self.settings_file = self.data_dir / "settings.json"
         self.config_manager = ConfigManager(str(self.data_dir))
+        self._last_bytes: Optional[bytes] = None  # 磁盘上 settings.json 的最新内容
+        self.config_file = self.data_dir / "config.json"
+        self._config_cache: dict = {}  # config_id -> (config.json 的 mtime_ns, config)
         self.settings = self._load()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
 
     def _load(self) -> dict:
         """加载设置"""
         if self.settings_file.exists():
             try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                data = self.settings_file.read_bytes()
+                settings = json.loads(data)
+                self._last_bytes = data
+                return settings
             except Exception as e:
                 print(f"加载设置失败: {e}")
         return self._default_settings()
@@ -39,62 +53,103 @@ class SettingsManager:
         }
 
     def save(self) -> None:
-        """保存设置"""
+        """保存设置 - 内容未变时跳过；先写临时文件并 fsync 再替换，避免写到一半留下损坏的文件"""
+        tmp_file = self.settings_file.with_suffix('.json.tmp')
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
+            data = json.dumps(self.settings, ensure_ascii=False, indent=2).encode('utf-8')
+            if data == self._last_bytes:
+                return
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.settings_file)
+            self._last_bytes = data
         except Exception as e:
             print(f"保存设置失败: {e}")
 
+    def _schedule_save(self) -> None:
+        """标记有未保存的修改，SAVE_DELAY 后再写盘（调用方需持有 _lock）"""
+        self._dirty = True
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(SAVE_DELAY, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self) -> None:
+        """立即写入未保存的修改（退出时自动调用）"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._dirty:
+                self._dirty = False
+                self.save()
+
     def get(self, key: str, default: any = None) -> any:
         """获取设置值"""
         return self.settings.get(key, default)
 
     def set(self, key: str, value: any) -> None:
         """设置值"""
-        self.settings[key] = value
-        self.save()
+        with self._lock:
+            self.settings[key] = value
+            self._config_cache.clear()
+            self._schedule_save()
 
     def update(self, data: dict) -> None:
         """批量更新设置"""
-        self.settings.update(data)
-        self.save()
+        with self._lock:
+            self.settings.update(data)
+            self._config_cache.clear()
+            self._schedule_save()
+
+    def _get_config_cached(self, config_id: Optional[str]) -> Optional[dict]:
+        """按 (config_id, 配置文件 mtime) 缓存配置查询，文件未变化时直接命中"""
+        try:
+            mtime = self.config_file.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        cached = self._config_cache.get(config_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        config = self.config_manager.get_config_by_id(config_id)
+        self._config_cache[config_id] = (mtime, config)
+        return config
 
     def get_current_api_key(self) -> Optional[str]:
         """获取当前 API KEY"""
-        config_id = self.get('current_config_id')
-        config = self.config_manager.get_config_by_id(config_id)
+        config = self._get_config_cached(self.get('current_config_id'))
         if config:
             return config.get('provider', {}).get('credentials', {}).get('api_key')
         return None
 
     def get_current_endpoint(self) -> Optional[str]:
         """获取当前端点"""
-        config_id = self.get('current_config_id')
-        config = self.config_manager.get_config_by_id(config_id)
+        config = self._get_config_cached(self.get('current_config_id'))
         if config:
             return config.get('provider', {}).get('endpoint')
         return None
 
     def get_current_model(self) -> Optional[str]:
         """获取当前模型"""
-        config_id = self.get('current_config_id')
-        config = self.config_manager.get_config_by_id(config_id)
+        config = self._get_config_cached(self.get('current_config_id'))
         if config:
             return config.get('provider', {}).get('model')
         return None
 
     def get_current_provider_type(self) -> Optional[str]:
         """获取当前提供商类型"""
-        config_id = self.get('current_config_id')
-        config = self.config_manager.get_config_by_id(config_id)
+        config = self._get_config_cached(self.get('current_config_id'))
         if config:
             return config.get('provider', {}).get('type')
         return None
 
     def set_current_config(self, config_id: str) -> bool:
         """设置当前配置"""
-        if self.config_manager.get_config_by_id(config_id):
+        self._config_cache.clear()
+        if self._get_config_cached(config_id):
             self.set('current_config_id', config_id)
             return True
         return False
@@ -107,7 +162,7 @@ class SettingsManager:
         """获取配置信息"""
         if config_id is None:
             config_id = self.get('current_config_id')
-        config = self.config_manager.get_config_by_id(config_id)
+        config = self._get_config_cached(config_id)
         if config:
             return {
                 'id': config.get('id'),
@@ -1,7 +1,11 @@
-# setup.py - 编译 Cython 模块
+# setup.py - 编译 Cython 模块（可选加速，未安装 Cython 时跳过，运行时回退纯 Python 实现）
 from setuptools import setup
-from Cython.Build import cythonize
 
-setup(
-    ext_modules=cythonize("core/fast_scan.pyx", language_level=3)
-)
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize(["core/fast_scan.pyx", "core/sse_decode.pyx"], language_level=3)
+
+setup(ext_modules=ext_modules)
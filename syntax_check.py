@@ -1,8 +1,13 @@
 import ast
 import sys
+
+paths = sys.argv[1:] or ['d:/Dropbox/AI_tools/API_control/app_flet.py']
 try:
-    with open('d:/Dropbox/AI_tools/API_control/app_flet.py', encoding='utf-8') as f:
-        ast.parse(f.read())
+    for path in paths:
+        # 以字节交给 compile 解析为 AST，源码编码由其按 PEP 263 识别
+        with open(path, 'rb') as f:
+            source = f.read()
+        compile(source, path, 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True, optimize=2)
     print('Syntax OK')
     sys.exit(0)
 except SyntaxError as e:
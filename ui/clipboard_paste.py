@@ -6,20 +6,83 @@
     # 在 main 函数中初始化，自动为所有 TextField 启用
     setup_clipboard_paste(page)
 """
+import queue
 import sys
 import threading
 import time
+from weakref import WeakKeyDictionary
 
 IS_WINDOWS = sys.platform == 'win32'
 
 if IS_WINDOWS:
     import ctypes
 
-try:
-    from pynput import mouse
-    HAS_PYNPUT = True
-except ImportError:
-    HAS_PYNPUT = False
+    # 剪贴板读取用到的函数只绑定一次并声明原型，调用时不再重复查找/设置
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _OpenClipboard = _user32.OpenClipboard
+    _OpenClipboard.argtypes = [ctypes.c_void_p]
+    _OpenClipboard.restype = ctypes.c_bool
+    _CloseClipboard = _user32.CloseClipboard
+    _CloseClipboard.argtypes = []
+    _CloseClipboard.restype = ctypes.c_bool
+    _GetClipboardData = _user32.GetClipboardData
+    _GetClipboardData.argtypes = [ctypes.c_uint]
+    _GetClipboardData.restype = ctypes.c_void_p
+    _GlobalLock = _kernel32.GlobalLock
+    _GlobalLock.argtypes = [ctypes.c_void_p]
+    _GlobalLock.restype = ctypes.c_void_p
+    _GlobalUnlock = _kernel32.GlobalUnlock
+    _GlobalUnlock.argtypes = [ctypes.c_void_p]
+    _GlobalUnlock.restype = ctypes.c_bool
+    _GlobalSize = _kernel32.GlobalSize
+    _GlobalSize.argtypes = [ctypes.c_void_p]
+    _GlobalSize.restype = ctypes.c_size_t
+
+    # 剪贴板监听窗口（message-only）用到的函数
+    from ctypes import wintypes
+    _WNDPROC = ctypes.WINFUNCTYPE(ctypes.c_ssize_t, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+    class WNDCLASSW(ctypes.Structure):
+        _fields_ = [("style", wintypes.UINT), ("lpfnWndProc", _WNDPROC),
+                    ("cbClsExtra", ctypes.c_int), ("cbWndExtra", ctypes.c_int),
+                    ("hInstance", wintypes.HINSTANCE), ("hIcon", wintypes.HICON),
+                    ("hCursor", wintypes.HANDLE), ("hbrBackground", wintypes.HBRUSH),
+                    ("lpszMenuName", wintypes.LPCWSTR), ("lpszClassName", wintypes.LPCWSTR)]
+
+    _DefWindowProcW = _user32.DefWindowProcW
+    _DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    _DefWindowProcW.restype = ctypes.c_ssize_t
+    _RegisterClassW = _user32.RegisterClassW
+    _RegisterClassW.argtypes = [ctypes.POINTER(WNDCLASSW)]
+    _RegisterClassW.restype = wintypes.ATOM
+    _CreateWindowExW = _user32.CreateWindowExW
+    _CreateWindowExW.argtypes = [wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+                                 ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID]
+    _CreateWindowExW.restype = wintypes.HWND
+    _DestroyWindow = _user32.DestroyWindow
+    _DestroyWindow.argtypes = [wintypes.HWND]
+    _AddClipboardFormatListener = _user32.AddClipboardFormatListener
+    _AddClipboardFormatListener.argtypes = [wintypes.HWND]
+    _AddClipboardFormatListener.restype = wintypes.BOOL
+    _RemoveClipboardFormatListener = _user32.RemoveClipboardFormatListener
+    _RemoveClipboardFormatListener.argtypes = [wintypes.HWND]
+    _GetMessageW = _user32.GetMessageW
+    _GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+    _GetMessageW.restype = wintypes.BOOL
+    _DispatchMessageW = _user32.DispatchMessageW
+    _DispatchMessageW.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    _PostThreadMessageW = _user32.PostThreadMessageW
+    _PostThreadMessageW.argtypes = [wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    _GetModuleHandleW = _kernel32.GetModuleHandleW
+    _GetModuleHandleW.argtypes = [wintypes.LPCWSTR]
+    _GetModuleHandleW.restype = wintypes.HMODULE
+
+CF_UNICODETEXT = 13
+WM_QUIT = 0x0012
+WM_CLIPBOARDUPDATE = 0x031D
+HWND_MESSAGE = -3
 
 try:
     import keyboard
@@ -31,12 +94,12 @@ _state = {
     'field': None,
     'field_value': "",
     'page': None,
-    'monitoring': False,
-    'click_pos': None,
-    'click_button': None,
-    'listener': None,
+    'armed': False,  # Win+V 窗口打开期间为 True，等待剪贴板更新
     'enabled': False,
     'keyboard_hook': None,  # 保存钩子引用以便清理
+    'my_hwnd': None,  # 本程序窗口句柄缓存
+    'clip_hwnd': None,  # Win+V 窗口句柄缓存（关闭后只是隐藏，句柄仍有效）
+    'listener_tid': None,  # 剪贴板监听线程 ID，用于退出时投递 WM_QUIT
 }
 
 
@@ -46,20 +109,18 @@ def _get_clipboard():
 
     def _read():
         for _ in range(10):
-            if ctypes.windll.user32.OpenClipboard(0):
+            if _OpenClipboard(None):
                 try:
-                    ctypes.windll.user32.GetClipboardData.restype = ctypes.c_void_p
-                    h = ctypes.windll.user32.GetClipboardData(13)
+                    h = _GetClipboardData(CF_UNICODETEXT)
                     if h:
-                        ctypes.windll.kernel32.GlobalLock.argtypes = [ctypes.c_void_p]
-                        ctypes.windll.kernel32.GlobalLock.restype = ctypes.c_void_p
-                        ptr = ctypes.windll.kernel32.GlobalLock(h)
+                        ptr = _GlobalLock(h)
                         if ptr:
-                            result[0] = ctypes.wstring_at(ptr)
-                            ctypes.windll.kernel32.GlobalUnlock.argtypes = [ctypes.c_void_p]
-                            ctypes.windll.kernel32.GlobalUnlock(h)
+                            # 按 GlobalSize 给出的长度直接映射内存块，读取范围有界
+                            n = _GlobalSize(h) // ctypes.sizeof(ctypes.c_wchar)
+                            result[0] = (ctypes.c_wchar * n).from_address(ptr).value
+                            _GlobalUnlock(h)
                 finally:
-                    ctypes.windll.user32.CloseClipboard()
+                    _CloseClipboard()
                 return
             time.sleep(0.05)
 
@@ -69,135 +130,187 @@ def _get_clipboard():
     return result[0]
 
 
-def _get_clipboard_window_hwnd():
-    """获取 Win+V 剪贴板窗口句柄和位置"""
-    user32 = ctypes.windll.user32
-
+if IS_WINDOWS:
     class RECT(ctypes.Structure):
         _fields_ = [("left", ctypes.c_long), ("top", ctypes.c_long),
                     ("right", ctypes.c_long), ("bottom", ctypes.c_long)]
 
+
+def _clip_window_rect(hwnd):
+    """hwnd 是可见的 Win+V 剪贴板窗口时返回其位置，否则返回 None"""
+    user32 = ctypes.windll.user32
+    if not user32.IsWindowVisible(hwnd):
+        return None
+    title = ctypes.create_unicode_buffer(256)
+    user32.GetWindowTextW(hwnd, title, 256)
+    rect = RECT()
+    user32.GetWindowRect(hwnd, ctypes.byref(rect))
+    w, h = rect.right - rect.left, rect.bottom - rect.top
+    if title.value == "" and 200 < w < 500 and 300 < h < 800:
+        return rect.left, rect.top, rect.right, rect.bottom
+    return None
+
+
+def _get_clipboard_window_hwnd():
+    """获取 Win+V 剪贴板窗口句柄和位置（优先复用上次找到的窗口）"""
+    user32 = ctypes.windll.user32
+
+    hwnd = _state['clip_hwnd']
+    if hwnd and user32.IsWindow(hwnd):
+        rect = _clip_window_rect(hwnd)
+        if rect:
+            return hwnd, rect
+
     hwnd = user32.FindWindowW("ApplicationFrameWindow", None)
     while hwnd:
-        if user32.IsWindowVisible(hwnd):
-            title = ctypes.create_unicode_buffer(256)
-            user32.GetWindowTextW(hwnd, title, 256)
-            rect = RECT()
-            user32.GetWindowRect(hwnd, ctypes.byref(rect))
-            w, h = rect.right - rect.left, rect.bottom - rect.top
-            if title.value == "" and 200 < w < 500 and 300 < h < 800:
-                return hwnd, (rect.left, rect.top, rect.right, rect.bottom)
+        rect = _clip_window_rect(hwnd)
+        if rect:
+            _state['clip_hwnd'] = hwnd
+            return hwnd, rect
         hwnd = user32.FindWindowExW(None, hwnd, "ApplicationFrameWindow", None)
     return None, None
 
 
+def _get_my_hwnd(page):
+    """获取本程序窗口句柄，句柄仍有效时直接复用"""
+    hwnd = _state['my_hwnd']
+    if not hwnd or not ctypes.windll.user32.IsWindow(hwnd):
+        hwnd = _state['my_hwnd'] = ctypes.windll.user32.FindWindowW(None, page.title)
+    return hwnd
+
+
 def _on_winv():
-    """Win+V 热键回调"""
-    if not _state['field'] or _state['monitoring'] or not _state['page']:
+    """Win+V 热键回调：剪贴板窗口出现后进入等待状态，由剪贴板更新通知完成粘贴"""
+    if not _state['field'] or not _state['page']:
         return
 
+    _get_my_hwnd(_state['page'])
+
+    # 等待剪贴板窗口出现：一出现就继续，最多等 0.3 秒
+    deadline = time.monotonic() + 0.3
+    clip_hwnd, _ = _get_clipboard_window_hwnd()
+    while not clip_hwnd and time.monotonic() < deadline:
+        time.sleep(0.02)
+        clip_hwnd, _ = _get_clipboard_window_hwnd()
+    _state['armed'] = bool(clip_hwnd)
+
+
+def _on_clipboard_update():
+    """WM_CLIPBOARDUPDATE 回调（监听线程）：Win+V 中选中条目后把内容追加到当前输入框"""
+    if not _state['armed']:
+        return
+    _state['armed'] = False
+    # 剪贴板窗口已隐藏说明 Win+V 早已关闭，这次更新与 Win+V 无关
+    clip_hwnd = _state['clip_hwnd']
+    if not clip_hwnd or not ctypes.windll.user32.IsWindowVisible(clip_hwnd):
+        return
+    threading.Thread(target=_paste_from_clipboard, args=(clip_hwnd,), daemon=True).start()
+
+
+def _paste_from_clipboard(clip_hwnd):
+    """等 Win+V 窗口关闭后切回本程序，并把剪贴板内容追加到输入框"""
+    user32 = ctypes.windll.user32
+    deadline = time.monotonic() + 0.5
+    while user32.IsWindowVisible(clip_hwnd) and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    new_clip = _get_clipboard()
     field = _state['field']
     page = _state['page']
-    my_hwnd = ctypes.windll.user32.FindWindowW(None, page.title)
-    _state['click_pos'] = None
-    _state['click_button'] = None
+    if not new_clip or not field or not page:
+        return
+    user32.keybd_event(0x12, 0, 0, 0)
+    user32.SetForegroundWindow(_state['my_hwnd'])
+    user32.keybd_event(0x12, 0, 2, 0)
+    old_val = field.value or ""
 
-    time.sleep(0.3)
+    def do_paste(old=old_val, txt=new_clip):
+        field.value = old + txt
+        field.focus()
+        page.update()
+    page.run_thread(do_paste)
 
-    # 获取剪贴板窗口位置
-    clip_hwnd, clip_rect = _get_clipboard_window_hwnd()
-    if not clip_rect:
-        return
 
-    def on_click(x, y, button, pressed):
-        if pressed:
-            _state['click_pos'] = (x, y)
-            _state['click_button'] = button
-
-    listener = mouse.Listener(on_click=on_click)
-    listener.start()
-    _state['listener'] = listener
-
-    def monitor():
-        _state['monitoring'] = True
-
-        while _state['monitoring']:
-            if _state['click_pos']:
-                x, y = _state['click_pos']
-                btn = _state['click_button']
-                r = clip_rect
-                # 判断点击是否在窗口内（带 20px 容差）
-                margin = 20
-                in_clip_window = (r[0] - margin) <= x <= (r[2] + margin) and (r[1] - margin) <= y <= (r[3] + margin)
-
-                if not in_clip_window:
-                    break
-
-                time.sleep(0.15)
-                # 检测窗口是否关闭
-                fg_hwnd = ctypes.windll.user32.GetForegroundWindow()
-                window_closed = fg_hwnd != clip_hwnd
-
-                if window_closed:
-                    if btn == mouse.Button.left:
-                        new_clip = _get_clipboard()
-                        if new_clip:
-                            ctypes.windll.user32.keybd_event(0x12, 0, 0, 0)
-                            ctypes.windll.user32.SetForegroundWindow(my_hwnd)
-                            ctypes.windll.user32.keybd_event(0x12, 0, 2, 0)
-                            old_val = _state['field'].value or ""
-                            def do_paste(old=old_val, txt=new_clip):
-                                _state['field'].value = old + txt
-                                _state['field'].focus()
-                                page.update()
-                            page.run_thread(do_paste)
-                    break
-                else:
-                    # 窗口未关闭时重置状态继续监控
-                    _state['click_pos'] = None
-                    _state['click_button'] = None
+def _wnd_proc(hwnd, msg, wparam, lparam):
+    if msg == WM_CLIPBOARDUPDATE:
+        _on_clipboard_update()
+        return 0
+    return _DefWindowProcW(hwnd, msg, wparam, lparam)
 
-            time.sleep(0.05)
 
-        if _state['listener']:
-            _state['listener'].stop()
-            _state['listener'] = None
-        _state['monitoring'] = False
+if IS_WINDOWS:
+    _wnd_proc_ptr = _WNDPROC(_wnd_proc)  # 保持引用，避免回调被回收
 
-    threading.Thread(target=monitor, daemon=True).start()
 
+def _clipboard_listener_loop():
+    """监听线程：创建 message-only 窗口并注册剪贴板监听，阻塞在消息循环上"""
+    _state['listener_tid'] = _kernel32.GetCurrentThreadId()
+    wc = WNDCLASSW()
+    wc.lpfnWndProc = _wnd_proc_ptr
+    wc.hInstance = _GetModuleHandleW(None)
+    wc.lpszClassName = "AICLIManagerClipboardListener"
+    if not _RegisterClassW(ctypes.byref(wc)):
+        return
+    hwnd = _CreateWindowExW(0, wc.lpszClassName, None, 0, 0, 0, 0, 0,
+                            HWND_MESSAGE, None, wc.hInstance, None)
+    if not hwnd:
+        return
+    if _AddClipboardFormatListener(hwnd):
+        msg = wintypes.MSG()
+        while _GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            _DispatchMessageW(ctypes.byref(msg))
+        _RemoveClipboardFormatListener(hwnd)
+    _DestroyWindow(hwnd)
 
-def _wrap_textfield(field):
-    """为单个 TextField 添加焦点和变化监听"""
-    original_on_focus = field.on_focus
-    original_on_change = field.on_change
 
-    def on_focus(e):
-        _state['field'] = e.control
-        _state['field_value'] = e.control.value or ""
-        if original_on_focus:
-            original_on_focus(e)
+# 各 TextField 原有的回调；所有输入框共用下面两个分发函数，不再为每个输入框创建闭包
+_orig_on_focus = WeakKeyDictionary()
+_orig_on_change = WeakKeyDictionary()
+
 
-    def on_change(e):
-        if _state['field'] == e.control:
-            _state['field_value'] = e.control.value or ""
-        if original_on_change:
-            original_on_change(e)
+def _dispatch_focus(e):
+    _state['field'] = e.control
+    _state['field_value'] = e.control.value or ""
+    cb = _orig_on_focus.get(e.control)
+    if cb:
+        cb(e)
 
-    field.on_focus = on_focus
-    field.on_change = on_change
+
+def _dispatch_change(e):
+    if _state['field'] == e.control:
+        _state['field_value'] = e.control.value or ""
+    cb = _orig_on_change.get(e.control)
+    if cb:
+        cb(e)
 
 
-def _scan_and_wrap(control):
-    """递归扫描并包装所有 TextField"""
+def _wrap_textfield(field):
+    """为单个 TextField 添加焦点和变化监听（重复调用无副作用）"""
+    if field.on_focus is not _dispatch_focus:
+        if field.on_focus:
+            _orig_on_focus[field] = field.on_focus
+        field.on_focus = _dispatch_focus
+    if field.on_change is not _dispatch_change:
+        if field.on_change:
+            _orig_on_change[field] = field.on_change
+        field.on_change = _dispatch_change
+
+
+def _scan_and_wrap(*controls):
+    """扫描控件树并包装所有 TextField（显式栈遍历，深层嵌套也不会递归溢出）"""
     import flet as ft
-    if isinstance(control, ft.TextField):
-        _wrap_textfield(control)
-    if hasattr(control, 'controls'):
-        for c in control.controls:
-            _scan_and_wrap(c)
-    if hasattr(control, 'content') and control.content:
-        _scan_and_wrap(control.content)
+    text_field = ft.TextField
+    stack = list(controls)
+    while stack:
+        c = stack.pop()
+        if isinstance(c, text_field):
+            _wrap_textfield(c)
+        children = getattr(c, 'controls', None)
+        if children:
+            stack.extend(children)
+        content = getattr(c, 'content', None)
+        if content:
+            stack.append(content)
 
 
 def setup_clipboard_paste(page):
@@ -206,7 +319,7 @@ def setup_clipboard_paste(page):
     Args:
         page: Flet Page 对象
     """
-    if not IS_WINDOWS or not HAS_KEYBOARD or not HAS_PYNPUT:
+    if not IS_WINDOWS or not HAS_KEYBOARD:
         return
 
     if _state['enabled']:
@@ -220,8 +333,8 @@ def setup_clipboard_paste(page):
 
     def wrapped_add(*controls):
         result = original_add(*controls)
-        for control in controls:
-            _scan_and_wrap(control)
+        # 扫描放到后台线程，不拖慢 page.add 的界面刷新（只给控件挂回调，不触发重建）
+        threading.Thread(target=_scan_and_wrap, args=controls, daemon=True).start()
         return result
 
     page.add = wrapped_add
@@ -236,24 +349,48 @@ def setup_clipboard_paste(page):
     page.open = wrapped_open
 
     # 扫描已有控件
-    for control in page.controls:
-        _scan_and_wrap(control)
+    _scan_and_wrap(*page.controls)
+
+    # 剪贴板变化由系统通知（WM_CLIPBOARDUPDATE），无需鼠标钩子和轮询
+    threading.Thread(target=_clipboard_listener_loop, daemon=True).start()
+
+    # Win+V 由常驻工作线程处理，热键回调只投递信号；连按多次合并为一次
+    winv_queue = queue.SimpleQueue()
+
+    def _winv_worker():
+        while True:
+            winv_queue.get()
+            while not winv_queue.empty():
+                winv_queue.get_nowait()
+            _on_winv()
+    threading.Thread(target=_winv_worker, daemon=True).start()
 
     # 使用 add_hotkey 检测 Win+V（suppress=False 确保按键传递给系统）
-    def _on_winv_hotkey():
-        threading.Thread(target=_on_winv, daemon=True).start()
-    keyboard.add_hotkey('win+v', _on_winv_hotkey, suppress=False)
+    keyboard.add_hotkey('win+v', lambda: winv_queue.put_nowait(1), suppress=False)
     _state['keyboard_hook'] = 'win+v'  # 保存用于清理
 
 
 def cleanup_clipboard_paste():
-    """清理键盘钩子"""
+    """清理键盘钩子和剪贴板监听"""
     if _state.get('keyboard_hook'):
         try:
             keyboard.remove_hotkey(_state['keyboard_hook'])
         except Exception:
             pass
         _state['keyboard_hook'] = None
+    if _state.get('listener_tid'):
+        _PostThreadMessageW(_state['listener_tid'], WM_QUIT, 0, 0)
+        _state['listener_tid'] = None
+
+
+def scan_clipboard_paste(control):
+    """为新挂到页面上的整棵控件树启用 Win+V 粘贴（后台扫描）
+
+    用于不经过 page.add/page.open 就显示的控件，例如切换导航时懒加载创建的页面。
+    """
+    if not _state['enabled']:
+        return
+    threading.Thread(target=_scan_and_wrap, args=(control,), daemon=True).start()
 
 
 def enable_clipboard_paste(field):
@@ -262,6 +399,6 @@ def enable_clipboard_paste(field):
     Args:
         field: Flet TextField 对象
     """
-    if not IS_WINDOWS or not HAS_KEYBOARD or not HAS_PYNPUT:
+    if not IS_WINDOWS or not HAS_KEYBOARD:
         return
     _wrap_textfield(field)
@@ -4,25 +4,40 @@
 
 VERSION = "1.1.0"
 
-import flet as ft
 import json
 import os
 import subprocess
 import sys
 import shutil
 import re
-import urllib.request
-import sqlite3
+import queue
+import functools
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
+from types import MappingProxyType
 import time
 import threading
 
+# 可选：orjson 加速配置/设置/提示词的读写，输出与 json.dumps(indent=2, ensure_ascii=False) 等价的 JSON。
+# 注意并非逐字节相同（浮点格式、NaN、非字符串键的转换不同），不要依赖两种实现写出的文件字节一致
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    _json_loads = json.loads
+
 DEBUG = False
 TRASH_RETENTION_DAYS = 7
 
 def show_snackbar(page, text, duration=1000):
     """显示 SnackBar 提示，默认 1 秒后自动关闭"""
+    import flet as ft  # 延迟导入：只读写配置的入口（脚本/工具）不必加载 flet
     try:
         page.open(ft.SnackBar(ft.Text(text), duration=duration))
         page.update()
@@ -31,6 +46,7 @@ def show_snackbar(page, text, duration=1000):
 
 
 # ========== 主题配置 ==========
+# 颜色直接用 flet 颜色名字符串（即 ft.Colors 的取值），构建主题时无需导入 flet
 THEMES = {
     "light": {
         "bg": "#f8f9fa",
@@ -39,15 +55,15 @@ THEMES = {
         "text_sec": "#666666",
         "primary": "#607d8b",
         "border": "#e0e0e0",
-        "header_bg": ft.Colors.GREY_100,
-        "selection_bg": ft.Colors.BLUE_50,
-        "icon_cli": ft.Colors.BLUE,
-        "icon_endpoint": ft.Colors.GREEN,
-        "icon_key_selected": ft.Colors.ORANGE,
-        "text_selected": ft.Colors.BLUE,
-        "global_bg": ft.Colors.PURPLE_50,
-        "global_border": ft.Colors.PURPLE_200,
-        "global_icon": ft.Colors.PURPLE,
+        "header_bg": "grey100",
+        "selection_bg": "blue50",
+        "icon_cli": "blue",
+        "icon_endpoint": "green",
+        "icon_key_selected": "orange",
+        "text_selected": "blue",
+        "global_bg": "purple50",
+        "global_border": "purple200",
+        "global_icon": "purple",
     },
     "dark": {
         "bg": "#1e1e1e",
@@ -92,9 +108,10 @@ MCP_DATA_DIR = BASE_DIR / "mcp_data"
 MCP_DATA_DIR.mkdir(exist_ok=True)
 MCP_DB_FILE = MCP_DATA_DIR / "mcp_registry.db"
 
-CLAUDE_DIR = Path(os.path.expanduser("~")) / ".claude"
-CODEX_DIR = Path(os.path.expanduser("~")) / ".codex"
-KIRO_DIR = Path(os.path.expanduser("~")) / ".kiro"
+_HOME = Path.home()
+CLAUDE_DIR = _HOME / ".claude"
+CODEX_DIR = _HOME / ".codex"
+KIRO_DIR = _HOME / ".kiro"
 
 # ========== 提示词标识符 ==========
 SYSTEM_PROMPT_START = "<!-- GLOBAL_PROMPT_START -->"
@@ -589,98 +606,164 @@ MCP_MARKETPLACES = [
 
 # ========== 工具函数 ==========
 def get_localized(value, lang='zh'):
-    if isinstance(value, dict):
-        return value.get(lang, value.get('zh', value.get('en', '')))
-    return value
+    # 非字典（普通字符串）直接返回；字典按 lang → zh → en 顺序短路查找，
+    # 不再预先求值全部回退项。用 in 判断以保留空字符串取值
+    if not isinstance(value, dict):
+        return value
+    if lang in value:
+        return value[lang]
+    if 'zh' in value:
+        return value['zh']
+    return value.get('en', '')
+
+# 已解析的 JSON 文件缓存：path -> (mtime_ns, size, data)，文件未变化时不再重复读取解析
+_json_cache = {}
+
+def _read_json_cached(path):
+    """读取 JSON 文件（按 mtime/size 缓存），文件不存在返回 None。
+    返回的是缓存对象本身，调用方交出前须自行复制"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    data = _json_loads(path.read_bytes())
+    _json_cache[path] = (st.st_mtime_ns, st.st_size, data)
+    return data
 
 def load_configs():
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('configurations', [])
+    data = _read_json_cached(CONFIG_FILE)
+    if data is not None:
+        # AppState 会原地修改配置，交出副本以免未保存的改动污染缓存
+        return [dict(c) if isinstance(c, dict) else c for c in data.get('configurations', [])]
     return []
 
 def save_configs(configs):
     data = {'version': '1.0', 'configurations': configs}
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    CONFIG_FILE.write_bytes(_json_dumps(data))
+    _json_cache.pop(CONFIG_FILE, None)
+
+# 按语言缓存本地化后的内置提示词（BUILTIN_PROMPTS 不会变化，内层为只读视图）
+_LOCALIZED_BUILTINS = {}
+
+def _localized_builtins(lang):
+    base = _LOCALIZED_BUILTINS.get(lang)
+    if base is None:
+        base = _LOCALIZED_BUILTINS[lang] = {
+            pid: MappingProxyType({
+                'id': pid,
+                'name': get_localized(p.get('name', ''), lang),
+                'content': get_localized(p.get('content', ''), lang),
+                'category': get_localized(p.get('category', ''), lang),
+                'is_builtin': p.get('is_builtin', False),
+                'prompt_type': p.get('prompt_type', 'user'),
+            })
+            for pid, p in BUILTIN_PROMPTS.items()
+        }
+    return base
+
+_prompt_db = None
+
+def _get_prompt_db():
+    """模块级共用的 PromptDB（延迟创建：database 模块反向依赖本模块），避免每次调用重复执行建表语句"""
+    global _prompt_db
+    if _prompt_db is None:
+        from .database import PromptDB
+        _prompt_db = PromptDB(DB_FILE)
+    return _prompt_db
 
 def load_prompts(lang='zh'):
-    custom = {}
-    if PROMPTS_FILE.exists():
-        with open(PROMPTS_FILE, 'r', encoding='utf-8') as f:
-            custom = json.load(f)
-    all_prompts = {}
-    for pid, p in BUILTIN_PROMPTS.items():
-        all_prompts[pid] = {
-            'id': pid,
-            'name': get_localized(p.get('name', ''), lang),
-            'content': get_localized(p.get('content', ''), lang),
-            'category': get_localized(p.get('category', ''), lang),
-            'is_builtin': p.get('is_builtin', False),
-            'prompt_type': p.get('prompt_type', 'user'),
-        }
-    for pid, p in custom.items():
-        all_prompts[pid] = {**p, 'id': pid}
+    """内置提示词 + SQLite 中的自定义提示词（prompts.json 已迁移到数据库）"""
+    all_prompts = dict(_localized_builtins(lang))
+    all_prompts.update(_get_prompt_db().get_custom())
     return all_prompts
 
 def save_prompts(prompts):
-    custom = {k: v for k, v in prompts.items() if not v.get('is_builtin')}
-    with open(PROMPTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(custom, f, indent=2, ensure_ascii=False)
+    """整体保存自定义提示词：写入 SQLite，不在 prompts 中的自定义项会被删除"""
+    _get_prompt_db().replace_custom(
+        {'name': k, **v, 'id': k} for k, v in prompts.items() if not v.get('is_builtin')
+    )
 
 def load_settings():
-    if SETTINGS_FILE.exists():
-        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    data = _read_json_cached(SETTINGS_FILE)
+    return dict(data) if data is not None else {}
+
+def _atomic_write_bytes(path, data):
+    """先写临时文件并 fsync，再原子替换目标文件，中途崩溃不会留下半截文件"""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 # ========== 设置保存缓冲区 - 减少频繁文件写入 ==========
 class _SettingsBuffer:
-    """设置缓冲区 - 批量保存设置，减少 I/O"""
+    """设置缓冲区 - 批量保存设置，减少 I/O（单个常驻后台线程负责写入）"""
     def __init__(self, save_interval=2.0):
         self.buffer = {}
         self.save_interval = save_interval
         self.last_save = time.time()
         self._lock = threading.Lock()
         self._pending_settings = None
-        self._timer = None
+        self._last_bytes = None              # 最近一次落盘的内容
+        self._wake = threading.Event()       # 有待写入的设置
+        self._flush_now = threading.Event()  # 结束等待期，立即写入
+        self._debouncing = False             # 后台线程正处于等待期
+        self._worker = None
 
     def save(self, settings):
         """延迟保存设置（2秒内的多次调用合并为一次写入）"""
         with self._lock:
             self._pending_settings = settings
-            if self._timer is None:
-                self._timer = threading.Timer(self.save_interval, self._do_save)
-                self._timer.daemon = True
-                self._timer.start()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name='settings-writer')
+                self._worker.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # 等待期内到达的保存请求合并为一次写入；flush() 可提前结束等待
+            with self._lock:
+                self._debouncing = True
+            self._flush_now.wait(self.save_interval)
+            with self._lock:
+                self._debouncing = False
+                self._flush_now.clear()
+            self._do_save()
 
     def _do_save(self):
         """实际执行保存"""
         with self._lock:
             if self._pending_settings is not None:
                 try:
-                    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(self._pending_settings, f, indent=2, ensure_ascii=False)
+                    data = _json_dumps(self._pending_settings)
+                    if self._last_bytes is None:
+                        try:
+                            self._last_bytes = SETTINGS_FILE.read_bytes()
+                        except OSError:
+                            pass
+                    # 与上次落盘内容逐字节相同则跳过，避免无意义的写盘和 mtime 变化
+                    if data != self._last_bytes:
+                        _atomic_write_bytes(SETTINGS_FILE, data)
+                        _json_cache.pop(SETTINGS_FILE, None)
+                        self._last_bytes = data
                 except Exception as e:
                     print(f"[save_settings] 错误: {e}")
                 self._pending_settings = None
-            self._timer = None
             self.last_save = time.time()
 
     def flush(self):
         """立即保存（用于程序退出前）"""
+        # 只在后台线程处于等待期时唤醒它；空闲时置位会让下一次 save() 跳过合并等待
         with self._lock:
-            if self._timer:
-                self._timer.cancel()
-                self._timer = None
-            if self._pending_settings is not None:
-                try:
-                    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(self._pending_settings, f, indent=2, ensure_ascii=False)
-                except Exception:
-                    pass
-                self._pending_settings = None
+            if self._debouncing:
+                self._flush_now.set()
+        self._do_save()
 
 _settings_buffer = _SettingsBuffer()
 
@@ -692,51 +775,152 @@ def flush_settings():
     """立即保存设置（程序退出时调用）"""
     _settings_buffer.flush()
 
+# ========== SQLite 连接池 ==========
+# 每个数据库文件：一个写连接（加锁串行）+ 最多 cpu_count 个只读连接（WAL 下可与写并发）
+_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+_SQLITE_READERS = os.cpu_count() or 4
+_sqlite_writers = {}   # path -> (conn, lock)
+_sqlite_readers = {}   # path -> [LifoQueue, 已创建数量]
+_sqlite_pool_lock = threading.Lock()
+
+def connect_db(db_path, **kwargs):
+    """打开 SQLite 连接：WAL 日志 + synchronous=NORMAL 等调优 PRAGMA"""
+    import sqlite3
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")  # 持久化到库文件，重复执行开销很小
+    for pragma in _SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _sqlite_writer(db_path):
+    import sqlite3
+    with _sqlite_pool_lock:
+        entry = _sqlite_writers.get(db_path)
+        if entry is None:
+            conn = connect_db(db_path, isolation_level='IMMEDIATE', check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            entry = _sqlite_writers[db_path] = (conn, threading.Lock())
+        return entry
+
+@contextmanager
+def get_conn(db_path=DB_FILE):
+    """获取写连接（独占），退出时提交，异常时回滚"""
+    conn, lock = _sqlite_writer(db_path)
+    with lock:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+@contextmanager
+def get_read_conn(db_path=DB_FILE):
+    """从只读连接池借出一个连接，用完归还"""
+    _sqlite_writer(db_path)  # 确保库文件已创建且为 WAL 模式
+    with _sqlite_pool_lock:
+        pool = _sqlite_readers.setdefault(db_path, [queue.LifoQueue(), 0])
+        conn = None
+        try:
+            conn = pool[0].get_nowait()
+        except queue.Empty:
+            if pool[1] < _SQLITE_READERS:
+                pool[1] += 1
+                conn = True  # 占位：在锁外创建新连接
+    if conn is True:
+        import sqlite3
+        try:
+            conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro&cache=private",
+                                   uri=True, check_same_thread=False)
+        except BaseException:
+            with _sqlite_pool_lock:
+                pool[1] -= 1
+            raise
+        conn.row_factory = sqlite3.Row
+        for pragma in _SQLITE_PRAGMAS[1:]:
+            conn.execute(pragma)
+    elif conn is None:
+        conn = pool[0].get()  # 池已满，等待其他线程归还
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        pool[0].put(conn)
+
 def has_windows_terminal() -> bool:
     """检测是否安装了 Windows Terminal"""
     if sys.platform != 'win32':
         return False
     return shutil.which('wt.exe') is not None
 
+def _scan_path(names):
+    """一次遍历 PATH 目录查找多个可执行文件，返回 {name: 完整路径}（按 PATH 顺序先到先得）"""
+    fold = str.lower if sys.platform == 'win32' else str
+    wanted = {fold(n): n for n in names}
+    found = {}
+    for d in os.environ.get('PATH', '').split(os.pathsep):
+        if not d or len(found) == len(wanted):
+            continue
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    name = wanted.get(fold(entry.name))
+                    if name and name not in found and entry.is_file() and os.access(entry.path, os.X_OK):
+                        found[name] = entry.path
+        except OSError:
+            continue
+    return found
+
 def detect_terminals():
     """检测可用终端 - 返回实际可执行的终端命令（不含 Windows Terminal，它作为宿主）"""
     terminals = {}
     if sys.platform == 'win32':
+        found = _scan_path(('pwsh.exe', 'powershell.exe', 'cmd.exe', 'bash.exe', 'wsl.exe'))
         # PowerShell 7 (pwsh) - 优先
-        pwsh_path = shutil.which('pwsh.exe')
+        pwsh_path = found.get('pwsh.exe')
         if pwsh_path:
             terminals['PowerShell 7'] = pwsh_path
         # PowerShell 5
-        ps_path = shutil.which('powershell.exe')
+        ps_path = found.get('powershell.exe')
         if ps_path:
             terminals['PowerShell 5'] = ps_path
         # CMD
-        cmd_path = shutil.which('cmd.exe')
+        cmd_path = found.get('cmd.exe')
         if cmd_path:
             terminals['CMD'] = cmd_path
         # Git Bash
-        bash_path = shutil.which('bash.exe')
+        bash_path = found.get('bash.exe')
         if bash_path and 'git' in bash_path.lower():
             terminals['Git Bash'] = bash_path
         # WSL - 只有真正可用时才添加
-        wsl_path = shutil.which('wsl.exe')
+        wsl_path = found.get('wsl.exe')
         if wsl_path:
             try:
-                result = subprocess.run(['wsl', '--status'], capture_output=True, timeout=3)
+                result = subprocess.run(['wsl', '--status'], capture_output=True, stdin=subprocess.DEVNULL, timeout=3)
                 if result.returncode == 0:
                     terminals['WSL'] = wsl_path
             except (subprocess.SubprocessError, OSError):
                 pass
     else:
         if sys.platform == 'darwin':
-            # macOS
+            # macOS：一次列出 /Applications，代替逐个 exists()
             candidates = [
                 ('Terminal', 'Terminal.app'),
                 ('iTerm', 'iTerm.app'),
             ]
+            try:
+                apps = set(os.listdir('/Applications'))
+            except OSError:
+                apps = set()
             for name, app in candidates:
-                app_path = f'/Applications/{app}'
-                if Path(app_path).exists():
+                if app in apps:
                     terminals[name] = app
         else:
             # Linux
@@ -746,8 +930,9 @@ def detect_terminals():
                 ('xfce4-terminal', 'xfce4-terminal'),
                 ('xterm', 'xterm'),
             ]
+            found = _scan_path(cmd for _, cmd in candidates)
             for name, cmd in candidates:
-                if shutil.which(cmd):
+                if cmd in found:
                     terminals[name] = cmd
     return terminals
 
@@ -756,7 +941,8 @@ def detect_python_envs():
     envs = {}
     base_entry = None
     try:
-        result = subprocess.run(['conda', 'env', 'list', '--json'], capture_output=True, text=True, timeout=10)
+        result = subprocess.run(['conda', 'env', 'list', '--json'], capture_output=True, text=True,
+                                stdin=subprocess.DEVNULL, timeout=10)
         if result.returncode == 0:
             data = json.loads(result.stdout)
             env_list = data.get('envs', [])
@@ -777,10 +963,33 @@ def detect_python_envs():
 
 def get_prompt_file_path(cli_type: str) -> Path:
     cli = CLI_TOOLS.get(cli_type, CLI_TOOLS['claude'])
-    home = Path.home()
     if cli['prompt_dir']:
-        return home / cli['prompt_dir'] / cli['prompt_file']
-    return home / cli['prompt_file']
+        return _HOME / cli['prompt_dir'] / cli['prompt_file']
+    return _HOME / cli['prompt_file']
+
+def _read_text(path: Path) -> str:
+    """整文件读取：read_bytes 一次读完再解码，换行处理与 read_text 一致"""
+    text = path.read_bytes().decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def _write_text(path: Path, text: str):
+    """整文件写入：一次 write 系统调用，换行处理与 write_text 一致"""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    path.write_bytes(text.encode('utf-8'))
+
+# 写入提示词前清理旧标记块（当前格式与历史格式），合并为一个模式只扫描一遍
+_RE_MARKER_BLOCKS = re.compile('|'.join('(?:%s)' % p for p in (
+    re.escape(SYSTEM_PROMPT_START) + r'.*?' + re.escape(SYSTEM_PROMPT_END),
+    r'<!-- USER_PROMPT_START:[^>]+ -->.*?' + re.escape(USER_PROMPT_END),
+    r'【LiangMu 用户提示词 Start - ID:[^】]+】.*?【LiangMu 用户提示词 End】',
+    r'【LiangMu-Studio Prompt Start】.*?【LiangMu-Studio Prompt End】',
+)), re.DOTALL)
+_RE_BLANK_LINES = re.compile(r'\n{3,}')
+# 分隔符含 NUL，不会出现在提示词或路径中，也不会与 {{var}} 拼出新变量
+_EXPAND_SEP = '\x00\x00LM_SPLIT\x00\x00'
 
 def write_prompt_to_cli(cli_type: str, system_content: str, user_content: str, user_id: str, workdir: str | None = None) -> Path:
     from core.template_vars import expand_template_vars
@@ -791,9 +1000,10 @@ def write_prompt_to_cli(cli_type: str, system_content: str, user_content: str, u
         file_path = get_prompt_file_path(cli_type)
     file_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # 展开模板变量
-    system_content = expand_template_vars(system_content, workdir)
-    user_content = expand_template_vars(user_content, workdir)
+    # 展开模板变量：两段内容用分隔符拼接后一次展开（共用同一时间戳），无变量时跳过
+    if '{{' in system_content or '{{' in user_content:
+        expanded = expand_template_vars(system_content + _EXPAND_SEP + user_content, workdir)
+        system_content, user_content = expanded.split(_EXPAND_SEP, 1)
 
     parts = []
     if system_content.strip():
@@ -803,43 +1013,107 @@ def write_prompt_to_cli(cli_type: str, system_content: str, user_content: str, u
         parts.append(f"{user_start}\n{user_content}\n{USER_PROMPT_END}")
     wrapped = "\n\n".join(parts)
 
-    existing = ""
+    existing_raw = None
     if file_path.exists():
-        existing = file_path.read_text(encoding='utf-8')
-
-    for marker_start, marker_end in [
-        (SYSTEM_PROMPT_START, SYSTEM_PROMPT_END),
-        (r'<!-- USER_PROMPT_START:[^>]+ -->', USER_PROMPT_END),
-        (r'【LiangMu 用户提示词 Start - ID:[^】]+】', r'【LiangMu 用户提示词 End】'),
-        (r'【LiangMu-Studio Prompt Start】', r'【LiangMu-Studio Prompt End】'),
-    ]:
-        pattern = re.escape(marker_start) if marker_start.startswith('<!--') and '[' not in marker_start else marker_start
-        pattern += r'.*?'
-        pattern += re.escape(marker_end) if marker_end.startswith('<!--') else marker_end
-        existing = re.sub(pattern, '', existing, flags=re.DOTALL)
-
-    existing = re.sub(r'\n{3,}', '\n\n', existing.strip())
+        existing_raw = _read_text(file_path)
+    existing = existing_raw or ""
+
+    existing = _RE_BLANK_LINES.sub('\n\n', _RE_MARKER_BLOCKS.sub('', existing).strip())
     new_content = (existing + "\n\n" + wrapped).strip() + "\n"
-    file_path.write_text(new_content, encoding='utf-8')
+    # 内容未变化时不重写，避免无意义的写盘和 mtime 变化
+    if new_content != existing_raw:
+        _write_text(file_path, new_content)
+        _detect_prompt_cached.cache_clear()  # mtime 精度较粗时同一时刻重写也不会读到旧结果
     return file_path
 
+class _PromptWriter:
+    """后台写提示词文件：同一 (cli_type, workdir) 的待写请求只保留最后一次"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = {}  # (cli_type, workdir) -> (args, callback)，按提交顺序
+        self._busy = False
+        self._thread = None
+
+    def submit(self, args, callback=None):
+        key = (args[0], args[4])
+        with self._cond:
+            self._pending.pop(key, None)
+            self._pending[key] = (args, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='prompt-writer')
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = next(iter(self._pending))
+                args, callback = self._pending.pop(key)
+                self._busy = True
+            path, error = None, None
+            try:
+                path = write_prompt_to_cli(*args)
+            except Exception as e:
+                error = e
+            if callback:
+                try:
+                    callback(path, error)
+                except Exception as e:
+                    print(f"[write_prompt_to_cli_async] 回调错误: {e}")
+            elif error is not None:
+                print(f"[write_prompt_to_cli_async] 错误: {error}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """等待所有待写请求完成（用于程序退出前）"""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+_prompt_writer = _PromptWriter()
+
+def write_prompt_to_cli_async(cli_type: str, system_content: str, user_content: str, user_id: str,
+                              workdir: str | None = None, callback=None):
+    """异步写入提示词，立即返回；完成后在后台线程调用 callback(file_path, error)"""
+    _prompt_writer.submit((cli_type, system_content, user_content, user_id, workdir), callback)
+
+def flush_prompt_writes():
+    """等待待写入的提示词落盘（程序退出时调用）"""
+    _prompt_writer.flush()
+
+# 系统/用户提示词块合并为一个交替模式，一次扫描同时取出两者
+_RE_PROMPT_BLOCKS = re.compile(
+    re.escape(SYSTEM_PROMPT_START) + r'(?P<sys>.*?)' + re.escape(SYSTEM_PROMPT_END)
+    + r'|<!-- USER_PROMPT_START:(?P<uid>[^>]+) -->(?P<user>.*?)' + re.escape(USER_PROMPT_END),
+    re.DOTALL)
+
 def detect_prompt_from_file(file_path: Path) -> tuple[str | None, str | None, str | None]:
-    if not file_path.exists():
+    """读取文件中的提示词块（按 mtime/size 缓存，文件未变化时不重复读取解析）"""
+    try:
+        st = file_path.stat()
+    except OSError:
         return None, None, None
-    content = file_path.read_text(encoding='utf-8')
+    return _detect_prompt_cached(str(file_path), st.st_mtime_ns, st.st_size)
+
+@functools.lru_cache(maxsize=64)
+def _detect_prompt_cached(path: str, mtime_ns: int, size: int) -> tuple[str | None, str | None, str | None]:
+    content = _read_text(Path(path))
     system_content = None
     user_content = None
     user_id = None
 
-    sys_pattern = re.escape(SYSTEM_PROMPT_START) + r'(.*?)' + re.escape(SYSTEM_PROMPT_END)
-    sys_match = re.search(sys_pattern, content, re.DOTALL)
-    if sys_match:
-        system_content = sys_match.group(1).strip()
-
-    user_pattern = r'<!-- USER_PROMPT_START:([^>]+) -->(.*?)' + re.escape(USER_PROMPT_END)
-    user_match = re.search(user_pattern, content, re.DOTALL)
-    if user_match:
-        user_id = user_match.group(1).strip()
-        user_content = user_match.group(2).strip()
+    for m in _RE_PROMPT_BLOCKS.finditer(content):
+        if m.group('sys') is not None:
+            if system_content is None:
+                system_content = m.group('sys').strip()
+        elif user_id is None:
+            user_id = m.group('uid').strip()
+            user_content = m.group('user').strip()
+        if system_content is not None and user_id is not None:
+            break
 
     return system_content, user_content, user_id
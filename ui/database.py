@@ -1,20 +1,44 @@
 # AI CLI Manager - Database Module
 import sqlite3
 import json
+import re
+import os
 import shutil
 import time
+import atexit
+import threading
+from collections.abc import Mapping
 from pathlib import Path
 from datetime import datetime
-from .common import CONFIG_DIR, DB_FILE, MCP_DATA_DIR, MCP_DB_FILE, CLAUDE_DIR, CODEX_DIR, TRASH_RETENTION_DAYS
+
+# 可选：ijson 流式解析 npm 搜索结果，边下载边处理（pip install ijson）
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+from .common import CONFIG_DIR, DB_FILE, MCP_DATA_DIR, MCP_DB_FILE, CLAUDE_DIR, CODEX_DIR, TRASH_RETENTION_DAYS, get_conn, get_read_conn, _atomic_write_bytes
+
+
+def _fetch_dicts(cur) -> list[dict]:
+    """游标结果转 dict 列表：列名只取一次，免去 sqlite3.Row 逐键按名查找"""
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in cur]
+
 
 # ========== SQLite 提示词数据库 ==========
 class PromptDB:
+    # 查询结果缓存在类上，save_prompts 等临时创建的实例写入后同样能使其失效
+    _cache: dict = {}  # (db_path, 查询键) -> {id: 行}
+    _cache_gen = 0  # 每次写入递增，防止写入前发起的查询把旧结果放回缓存
+
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self._init_db()
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('''CREATE TABLE IF NOT EXISTS prompts (
                 id TEXT PRIMARY KEY,
                 name TEXT NOT NULL,
@@ -25,76 +49,113 @@ class PromptDB:
                 created_at TEXT,
                 updated_at TEXT
             )''')
-            conn.commit()
+
+    def _cached_query(self, key, sql: str, params: tuple = ()) -> dict:
+        """缓存的整表查询，由本类的写方法负责失效"""
+        key = (self.db_path, key)
+        rows = PromptDB._cache.get(key)
+        if rows is None:
+            gen = PromptDB._cache_gen
+            with get_read_conn(self.db_path) as conn:
+                rows = {r['id']: r for r in _fetch_dicts(conn.execute(sql, params))}
+            if gen == PromptDB._cache_gen:
+                PromptDB._cache[key] = rows
+        # 调用方会直接修改返回的字典（如 state.prompts），每次交出副本
+        return {k: dict(v) for k, v in rows.items()}
+
+    @staticmethod
+    def _invalidate():
+        PromptDB._cache_gen += 1
+        PromptDB._cache.clear()
 
     def get_all(self) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute('SELECT * FROM prompts ORDER BY prompt_type DESC, name').fetchall()
-        return {r['id']: dict(r) for r in rows}
+        return self._cached_query('all', 'SELECT * FROM prompts ORDER BY prompt_type DESC, name')
 
     def get_by_lang(self, lang: str) -> dict:
         """获取指定语言的提示词（id 以 _zh 或 _en 结尾）"""
-        suffix = f"_{lang}"
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
-                "SELECT * FROM prompts WHERE id LIKE ? OR is_builtin=0 ORDER BY prompt_type DESC, name",
-                (f"%{suffix}",)
-            ).fetchall()
-        return {r['id']: dict(r) for r in rows}
+        return self._cached_query(
+            ('lang', lang),
+            "SELECT * FROM prompts WHERE id LIKE ? OR is_builtin=0 ORDER BY prompt_type DESC, name",
+            (f"%_{lang}",)
+        )
 
     def get_by_type(self, prompt_type: str) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute('SELECT * FROM prompts WHERE prompt_type=? ORDER BY name', (prompt_type,)).fetchall()
-        return {r['id']: dict(r) for r in rows}
+        with get_read_conn(self.db_path) as conn:
+            rows = _fetch_dicts(conn.execute('SELECT * FROM prompts WHERE prompt_type=? ORDER BY name', (prompt_type,)))
+        return {r['id']: r for r in rows}
+
+    def get_custom(self) -> dict:
+        """非内置提示词（旧 prompts.json 中保存的那部分）"""
+        with get_read_conn(self.db_path) as conn:
+            rows = _fetch_dicts(conn.execute('SELECT * FROM prompts WHERE is_builtin=0 ORDER BY prompt_type DESC, name'))
+        return {r['id']: r for r in rows}
 
     def get_system_prompt(self) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT * FROM prompts WHERE prompt_type="system" LIMIT 1').fetchone()
         return dict(row) if row else None
 
+    _UPSERT_SQL = '''INSERT OR REPLACE INTO prompts
+                (id, name, content, category, prompt_type, is_builtin, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, COALESCE((SELECT created_at FROM prompts WHERE id=?), ?), ?)'''
+
+    @staticmethod
+    def _row_params(prompt: dict, now: str) -> tuple:
+        return (prompt['id'], prompt['name'], prompt.get('content', ''),
+                prompt.get('category', '用户'), prompt.get('prompt_type', 'user'),
+                1 if prompt.get('is_builtin') else 0, prompt['id'], now, now)
+
     def save(self, prompt: dict):
         now = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''INSERT OR REPLACE INTO prompts
-                (id, name, content, category, prompt_type, is_builtin, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, COALESCE((SELECT created_at FROM prompts WHERE id=?), ?), ?)''',
-                (prompt['id'], prompt['name'], prompt.get('content', ''),
-                 prompt.get('category', '用户'), prompt.get('prompt_type', 'user'),
-                 1 if prompt.get('is_builtin') else 0, prompt['id'], now, now))
-            conn.commit()
+        with get_conn(self.db_path) as conn:
+            conn.execute(self._UPSERT_SQL, self._row_params(prompt, now))
+        self._invalidate()
+
+    def save_many(self, prompts):
+        """批量 upsert：一个连接、一个事务内 executemany"""
+        now = datetime.now().isoformat()
+        with get_conn(self.db_path) as conn:
+            conn.executemany(self._UPSERT_SQL, [self._row_params(p, now) for p in prompts])
+        self._invalidate()
+
+    def replace_custom(self, prompts):
+        """整体替换非内置提示词：同一事务内 upsert 传入项并删除不在其中的旧项"""
+        now = datetime.now().isoformat()
+        params = [self._row_params(p, now) for p in prompts]
+        with get_conn(self.db_path) as conn:
+            conn.execute('DELETE FROM prompts WHERE is_builtin=0 AND id NOT IN (SELECT value FROM json_each(?))',
+                         (json.dumps([p[0] for p in params]),))
+            conn.executemany(self._UPSERT_SQL, params)
+        self._invalidate()
 
     def delete(self, prompt_id: str):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM prompts WHERE id=? AND is_builtin=0', (prompt_id,))
-            conn.commit()
+        self._invalidate()
 
     def migrate_from_json(self, json_prompts: dict):
-        for pid, p in json_prompts.items():
-            if not self.get_all().get(pid):
-                self.save({
-                    'id': pid,
-                    'name': p.get('name', pid),
-                    'content': p.get('content', ''),
-                    'category': p.get('category', '用户'),
-                    'prompt_type': 'user',
-                    'is_builtin': p.get('is_builtin', False),
-                })
+        """导入旧 JSON 提示词（已存在的 id 不覆盖）"""
+        with get_read_conn(self.db_path) as conn:
+            existing = {r[0] for r in conn.execute('SELECT id FROM prompts')}
+        self.save_many({
+            'id': pid,
+            'name': p.get('name', pid),
+            'content': p.get('content', ''),
+            'category': p.get('category', '用户'),
+            'prompt_type': 'user',
+            'is_builtin': p.get('is_builtin', False),
+        } for pid, p in json_prompts.items() if pid not in existing)
 
     def update_builtin(self, prompts: dict):
         """强制更新内置提示词（覆盖已有内容）"""
-        for pid, p in prompts.items():
-            self.save({
-                'id': pid,
-                'name': p.get('name', pid),
-                'content': p.get('content', ''),
-                'category': p.get('category', '用户'),
-                'prompt_type': 'user',
-                'is_builtin': True,
-            })
+        self.save_many({
+            'id': pid,
+            'name': p.get('name', pid),
+            'content': p.get('content', ''),
+            'category': p.get('category', '用户'),
+            'prompt_type': 'user',
+            'is_builtin': True,
+        } for pid, p in prompts.items())
 
 
 # ========== MCP 本地仓库管理 ==========
@@ -125,13 +186,19 @@ class MCPRegistry:
         'calendar': '日历', 'schedule': '日历',
         'note': '笔记', 'obsidian': '笔记',
     }
+    # 关键词合并为一个正则一次扫描；先行断言在每个位置取排在最前的关键词，
+    # 再按字典顺序取优先级最高者，结果与逐个 `kw in text` 判断一致
+    _CATEGORY_RE = re.compile('(?=(' + '|'.join(map(re.escape, CATEGORY_MAP)) + '))')
+    _CATEGORY_RANK = {kw: i for i, kw in enumerate(CATEGORY_MAP)}
+    # AS MATERIALIZED 需要 SQLite 3.35+，旧版本省略（CTE 仍然有效，只是可能被展开）
+    _CTE_MATERIALIZED = 'MATERIALIZED ' if sqlite3.sqlite_version_info >= (3, 35) else ''
 
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self._init_db()
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('''CREATE TABLE IF NOT EXISTS servers (
                 id TEXT PRIMARY KEY,
                 name TEXT NOT NULL,
@@ -165,14 +232,38 @@ class MCPRegistry:
                 ''')
             except sqlite3.OperationalError:
                 pass  # FTS5 可能不支持，忽略
-            conn.commit()
-
-    def _guess_category(self, name: str, desc: str) -> str:
-        text = (name + ' ' + desc).lower()
-        for kw, cat in self.CATEGORY_MAP.items():
-            if kw in text:
-                return cat
-        return '其他'
+            # 三元组分词索引：支持任意子串（含中文）匹配，主 FTS 查询失败时代替 LIKE 全表扫描（需 SQLite 3.34+）
+            try:
+                new_tri = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='servers_fts_tri'").fetchone()
+                conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS servers_fts_tri USING fts5(
+                    name, description, tokenize='trigram', content='servers', content_rowid='rowid'
+                )''')
+                conn.executescript('''
+                    CREATE TRIGGER IF NOT EXISTS servers_tri_ai AFTER INSERT ON servers BEGIN
+                        INSERT INTO servers_fts_tri(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_tri_ad AFTER DELETE ON servers BEGIN
+                        INSERT INTO servers_fts_tri(servers_fts_tri, rowid, name, description) VALUES('delete', old.rowid, old.name, old.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_tri_au AFTER UPDATE ON servers BEGIN
+                        INSERT INTO servers_fts_tri(servers_fts_tri, rowid, name, description) VALUES('delete', old.rowid, old.name, old.description);
+                        INSERT INTO servers_fts_tri(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+                    END;
+                ''')
+                if new_tri:
+                    conn.execute("INSERT INTO servers_fts_tri(servers_fts_tri) VALUES('rebuild')")  # 索引已有数据
+            except sqlite3.OperationalError:
+                pass  # 不支持 trigram 分词，搜索时退回 LIKE
+            # 按分类筛选/分组走索引；首次建索引后 ANALYZE 一次，供查询规划器使用
+            new_index = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='idx_servers_category'").fetchone()
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_servers_category ON servers(category)')
+            if new_index:
+                conn.execute('ANALYZE')
+
+    def _guess_category(self, text: str) -> str:
+        """text 为已转小写的 "名称 描述" """
+        kw = min((m.group(1) for m in self._CATEGORY_RE.finditer(text)), key=self._CATEGORY_RANK.__getitem__, default=None)
+        return self.CATEGORY_MAP[kw] if kw else '其他'
 
     def _normalize_npm(self, obj: dict) -> dict | None:
         pkg = obj.get('package', {})
@@ -196,12 +287,40 @@ class MCPRegistry:
             'package': name,
             'command': 'npx',
             'args': f'-y {name}',
-            'category': self._guess_category(name, str(desc)),
+            'category': self._guess_category(name_lower + ' ' + desc_lower),
             'source': 'npm',
         }
 
+    @staticmethod
+    def _iter_npm_objects(resp):
+        """逐个产出 npm 搜索结果中的 objects；有 ijson 时随下载分块流式解析，不必先读入整个响应"""
+        if not HAS_IJSON:
+            yield from json.loads(resp.read()).get('objects', [])
+            return
+        items = ijson.sendable_list()
+        coro = ijson.items_coro(items, 'objects.item', use_float=True)
+        for chunk in resp.iter_bytes():
+            coro.send(chunk)
+            yield from items
+            del items[:]
+        coro.close()
+        yield from items
+
+    def _fetch_npm_rows(self, client, url: str, now: str) -> list[tuple]:
+        """下载一页 npm 搜索结果并转换为待插入的行"""
+        rows = []
+        with client.stream('GET', url) as resp:
+            resp.raise_for_status()
+            for item in self._iter_npm_objects(resp):
+                s = self._normalize_npm(item)
+                if s:
+                    rows.append((s['id'], s['name'], s['description'], s['package'], s['command'],
+                                 s['args'], s['category'], s['source'], now))
+        return rows
+
     def fetch_all(self, callback=None, quick=True) -> tuple[int, list[str]]:
-        import urllib.request
+        import httpx
+        from concurrent.futures import ThreadPoolExecutor
         errors, new_count = [], 0
         now = datetime.now().isoformat()
         if quick:
@@ -215,55 +334,83 @@ class MCPRegistry:
                 for i in range(0, 3000, 250):
                     urls.append(f'https://registry.npmjs.org/-/v1/search?text={kw}&size=250&from={i}')
 
-        for i, url in enumerate(urls):
-            if callback:
-                callback(f"获取 npm ({i+1}/{len(urls)})...")
+        def fetch(url):
             try:
-                req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'})
-                with urllib.request.urlopen(req, timeout=30) as resp:
-                    raw = json.loads(resp.read().decode('utf-8'))
-                    items = raw.get('objects', [])
-                    hit_existing = 0
-                    with sqlite3.connect(self.db_path) as conn:
-                        for item in items:
-                            s = self._normalize_npm(item)
-                            if not s:
-                                continue
-                            cur = conn.execute('SELECT 1 FROM servers WHERE id=?', (s['id'],))
-                            if cur.fetchone():
-                                hit_existing += 1
-                                if quick and hit_existing >= 5:
-                                    break
-                            else:
-                                hit_existing = 0
-                                conn.execute('''INSERT INTO servers (id,name,description,package,command,args,category,source,updated_at)
-                                    VALUES (?,?,?,?,?,?,?,?,?)''',
-                                    (s['id'], s['name'], s['description'], s['package'], s['command'], s['args'], s['category'], s['source'], now))
-                                new_count += 1
-                        conn.commit()
+                return self._fetch_npm_rows(client, url, now), None
             except Exception as ex:
-                errors.append(f"npm: {ex}")
+                return None, ex
+
+        # INSERT OR IGNORE 由主键去重，一条语句代替“先查是否存在再插入”；
+        # 新增条数取 rowcount（被忽略的行为 0，且不含 FTS 触发器的写入）
+        insert_sql = '''INSERT OR IGNORE INTO servers (id,name,description,package,command,args,category,source,updated_at)
+            VALUES (?,?,?,?,?,?,?,?,?)'''
+        # 共用一个 keep-alive 连接池（httpx 自动协商 gzip 并解压），多页并发下载；
+        # 数据库写入仍在当前线程按页顺序进行
+        with httpx.Client(headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'},
+                          timeout=30, follow_redirects=True) as client, \
+                ThreadPoolExecutor(max_workers=min(6, len(urls))) as pool:
+            for i, (rows, ex) in enumerate(pool.map(fetch, urls)):
+                if callback:
+                    callback(f"获取 npm ({i+1}/{len(urls)})...")
+                if ex is not None:
+                    errors.append(f"npm: {ex}")
+                    continue
+                # 每页一个事务（get_conn 退出时提交、异常时回滚）；不跨网络请求持有写锁
+                try:
+                    with get_conn(self.db_path) as conn:
+                        if quick:
+                            # 快速模式：连续 5 个已存在即认为后面都是旧数据，逐条插入以便及时停止
+                            hit_existing = 0
+                            for row in rows:
+                                if conn.execute(insert_sql, row).rowcount:
+                                    new_count += 1
+                                    hit_existing = 0
+                                else:
+                                    hit_existing += 1
+                                    if hit_existing >= 5:
+                                        break
+                        elif rows:
+                            new_count += conn.executemany(insert_sql, rows).rowcount
+                except Exception as ex:
+                    errors.append(f"npm: {ex}")
 
         if callback:
             callback(f"完成：新增 {new_count} 个 MCP")
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('updated_at', now))
-            conn.commit()
         return new_count, errors
 
+    @staticmethod
+    def _fts_queries(keyword: str):
+        """依次尝试的 (FTS 表, MATCH 表达式)：先分词前缀匹配，再三元组子串匹配（至少 3 个字符）"""
+        # 关键词作为 FTS5 短语：内部双引号按语法转义为 ""，避免语法错误落入 LIKE 全表扫描
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        yield 'servers_fts', phrase + '*'
+        if len(keyword) >= 3:
+            yield 'servers_fts_tri', phrase
+
+    def _fts_search(self, conn, table: str, match: str, category: str, limit: int) -> list:
+        if category and category != '全部':
+            # MATCH 与分类条件同时出现在 JOIN 上时，规划器会改为扫描 servers 全表；
+            # 先在 CTE 中物化 FTS 结果，再按 rowid 回表过滤分类
+            sql = f'''WITH fts AS {self._CTE_MATERIALIZED}(SELECT rowid FROM {table} WHERE {table} MATCH ?)
+                SELECT s.* FROM fts JOIN servers s ON s.rowid = fts.rowid WHERE s.category = ? LIMIT {limit}'''
+            return conn.execute(sql, (match, category)).fetchall()
+        sql = f'''SELECT s.* FROM servers s JOIN {table} f ON s.rowid = f.rowid WHERE {table} MATCH ? LIMIT {limit}'''
+        return conn.execute(sql, (match,)).fetchall()
+
     def search(self, keyword: str = '', category: str = '全部', limit: int = 200) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             if keyword:
-                try:
-                    sql = '''SELECT s.* FROM servers s JOIN servers_fts f ON s.rowid = f.rowid WHERE servers_fts MATCH ?'''
-                    params = [f'"{keyword}"*']
-                    if category and category != '全部':
-                        sql += ' AND s.category = ?'
-                        params.append(category)
-                    sql += f' LIMIT {limit}'
-                    rows = conn.execute(sql, params).fetchall()
-                except sqlite3.OperationalError:
+                rows = None
+                for table, match in self._fts_queries(keyword):
+                    try:
+                        rows = self._fts_search(conn, table, match, category, limit)
+                    except sqlite3.OperationalError:
+                        continue  # 该索引不可用，尝试下一种
+                    if rows:
+                        break  # 前缀匹配无结果时（如中文句中子串），再用三元组子串匹配
+                if rows is None:
                     sql = 'SELECT * FROM servers WHERE (name LIKE ? OR description LIKE ?)'
                     params = [f'%{keyword}%', f'%{keyword}%']
                     if category and category != '全部':
@@ -282,18 +429,16 @@ class MCPRegistry:
             return [dict(r) for r in rows]
 
     def get_servers(self, limit: int = 10000) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(f'SELECT * FROM servers LIMIT {limit}').fetchall()
-        return [dict(r) for r in rows]
+        with get_read_conn(self.db_path) as conn:
+            return _fetch_dicts(conn.execute(f'SELECT * FROM servers LIMIT {limit}'))
 
     def get_categories(self) -> list[tuple[str, int]]:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT category, COUNT(*) FROM servers GROUP BY category ORDER BY COUNT(*) DESC').fetchall()
-        return rows
+        return [tuple(r) for r in rows]
 
     def get_stats(self) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_read_conn(self.db_path) as conn:
             total = conn.execute('SELECT COUNT(*) FROM servers').fetchone()[0]
             updated = conn.execute('SELECT value FROM meta WHERE key="updated_at"').fetchone()
         return {'total': total, 'updated_at': updated[0] if updated else None}
@@ -316,17 +461,37 @@ class TrashManager:
         self.trash_dir = claude_dir / "trash"
         self.trash_dir.mkdir(exist_ok=True)
         self.manifest_file = self.trash_dir / "manifest.json"
+        # 已解析的清单及其 (mtime_ns, size)；文件未被外部修改时直接复用，不再每次重新解析
+        self._manifest = None
+        self._manifest_key = None
+
+    def _manifest_stat(self):
+        try:
+            st = self.manifest_file.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
     def _load_manifest(self) -> dict:
-        if self.manifest_file.exists():
+        key = self._manifest_stat()
+        if self._manifest is not None and key == self._manifest_key:
+            return self._manifest
+        manifest = {"items": []}
+        if key is not None:
             try:
-                return json.loads(self.manifest_file.read_text(encoding='utf-8'))
-            except (json.JSONDecodeError, OSError):
+                manifest = json.loads(self.manifest_file.read_bytes())
+            except (json.JSONDecodeError, OSError, UnicodeDecodeError):
                 pass  # 文件损坏或读取失败
-        return {"items": []}
+        self._manifest, self._manifest_key = manifest, key
+        return manifest
 
     def _save_manifest(self, manifest: dict):
-        self.manifest_file.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        try:
+            _atomic_write_bytes(self.manifest_file, json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+        except OSError:
+            self._manifest = None  # 写入失败，下次重新从磁盘读取
+            raise
+        self._manifest, self._manifest_key = manifest, self._manifest_stat()
 
     def move_to_trash(self, session_id: str, project_name: str, session_file: Path, file_history_dir: Path | None = None) -> bool:
         try:
@@ -388,7 +553,7 @@ class TrashManager:
         return removed
 
     def get_trash_items(self) -> list:
-        return self._load_manifest().get("items", [])
+        return list(self._load_manifest().get("items", []))
 
     def permanently_delete(self, item: dict):
         shutil.rmtree(self.trash_dir / item["dir_name"], ignore_errors=True)
@@ -426,24 +591,80 @@ class RustTrashManager:
         return lh.cleanup_expired_trash(self.cli_type, TRASH_RETENTION_DAYS)
 
 
+class _LazyJSON(Mapping):
+    """tool_input 的只读映射，首次访问时才解析 JSON（大多数块从不被展开查看）"""
+    __slots__ = ('_raw', '_value')
+
+    def __init__(self, raw: str):
+        self._raw = raw
+        self._value = None
+
+    def _get(self):
+        if self._raw is not None:
+            try:
+                self._value = json.loads(self._raw)
+            except json.JSONDecodeError:
+                self._value = self._raw
+            self._raw = None
+        return self._value
+
+    def _dict(self) -> dict:
+        value = self._get()
+        return value if isinstance(value, dict) else {}
+
+    def __getitem__(self, key):
+        return self._dict()[key]
+
+    def __iter__(self):
+        return iter(self._dict())
+
+    def __len__(self):
+        return len(self._dict())
+
+    def __repr__(self):
+        return repr(self._get())
+
+    def __str__(self):
+        return str(self._get())
+
+
 class HistoryManager:
     """Claude 历史记录管理器 - 使用 Rust 加速"""
     def __init__(self, claude_dir: Path):
         self.claude_dir = claude_dir
         self.trash_manager = RustTrashManager('claude')
+        self._proj_cache = None  # (目录签名, 项目列表, {项目 id: cwd})
+
+    def _projects_signature(self):
+        """各项目目录的 (名称, mtime)；Rust 端按目录 mtime 排序，签名不变则结果不变"""
+        try:
+            with os.scandir(self.claude_dir / "projects") as it:
+                return tuple(sorted((e.name, e.stat().st_mtime_ns) for e in it if e.is_dir()))
+        except OSError:
+            return ()
+
+    def _projects(self) -> tuple[list, dict]:
+        """带缓存的全量项目列表和 id -> cwd 映射"""
+        sig = self._projects_signature()
+        if self._proj_cache is None or self._proj_cache[0] != sig:
+            projects = lh.list_projects('claude', 0)
+            self._proj_cache = (sig, projects, {p.id: p.cwd or '' for p in projects})
+        return self._proj_cache[1], self._proj_cache[2]
 
     def list_projects(self, with_cwd: bool = False, limit: int = 0) -> list:
-        projects = lh.list_projects('claude', limit if limit > 0 else 0)
+        projects = self._projects()[0]
+        if limit > 0:
+            projects = projects[:limit]
         if not with_cwd:
             return [p.id for p in projects]
         return [(p.id, p.cwd or '') for p in projects]
 
     def get_project_cwd(self, project_name: str) -> str:
-        projects = lh.list_projects('claude', 0)
-        for p in projects:
-            if p.id == project_name:
-                return p.cwd or ''
-        return ''
+        # 项目的 cwd 不会变，命中缓存时无需重新扫描
+        cwd_map = self._proj_cache[2] if self._proj_cache else {}
+        if project_name not in cwd_map:
+            cwd_map = self._projects()[1]
+        return cwd_map.get(project_name, '')
 
     def load_project(self, project_name: str) -> dict:
         sessions = lh.load_project('claude', project_name)
@@ -475,10 +696,7 @@ class HistoryManager:
                 if b.tool_name:
                     block['name'] = b.tool_name
                 if b.tool_input:
-                    try:
-                        block['input'] = json.loads(b.tool_input)
-                    except json.JSONDecodeError:
-                        block['input'] = b.tool_input
+                    block['input'] = _LazyJSON(b.tool_input)
                 content.append(block)
             result.append({
                 'type': m.msg_type,
@@ -494,19 +712,22 @@ class HistoryManager:
         result = {}
         if not projects_dir.exists():
             return result
-        project_dirs = list(projects_dir.iterdir())
-        for project_dir in project_dirs:
-            if not project_dir.is_dir():
-                continue
-            if callback:
-                callback(f"扫描: {project_dir.name[:30]}...")
-            project_name = project_dir.name
-            result[project_name] = self.load_project(project_name)
+        names = [d.name for d in projects_dir.iterdir() if d.is_dir()]
+        if not names:
+            return result
+        from concurrent.futures import ThreadPoolExecutor
+        # lh.load_project/load_session 解析时释放 GIL，多项目可并行读取；回调仍在调用线程按序触发
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1, len(names))) as pool:
+            for project_name, data in zip(names, pool.map(self.load_project, names)):
+                if callback:
+                    callback(f"扫描: {project_name[:30]}...")
+                result[project_name] = data
         return result
 
     def delete_session(self, project_name: str, session_id: str, info: dict) -> bool:
         try:
             lh.delete_session('claude', str(info['file']))
+            self._proj_cache = None
             return True
         except Exception:
             return False
@@ -519,17 +740,20 @@ class HistoryManager:
 
     def delete_sessions_by_cwd(self, cwd: str) -> int:
         """删除指定工作目录的所有会话，返回删除数量"""
-        count = 0
-        projects = lh.list_projects('claude', 0)
-        for p in projects:
-            if p.cwd == cwd:
-                sessions = lh.load_project('claude', p.id)
-                for s in sessions:
-                    try:
-                        lh.delete_session('claude', str(s.file))
-                        count += 1
-                    except Exception:
-                        pass
+        if hasattr(lh, 'delete_sessions_by_cwd'):
+            # 新版扩展在 Rust 内一次完成筛选和删除
+            count = lh.delete_sessions_by_cwd('claude', cwd)
+        else:
+            count = 0
+            projects = self._projects()[0]
+            sessions = [s for p in projects if p.cwd == cwd for s in lh.load_project('claude', p.id)]
+            for s in sessions:
+                try:
+                    lh.delete_session('claude', s.file_path)
+                    count += 1
+                except Exception:
+                    pass
+        self._proj_cache = None
         return count
 
 
@@ -539,9 +763,33 @@ class CodexHistoryManager:
     def __init__(self, codex_dir: Path):
         self.codex_dir = codex_dir
         self.trash_manager = RustTrashManager('codex')
+        self._proj_cache = None  # (签名, 项目列表)
+
+    def _sessions_signature(self):
+        """全部会话文件的 (数量, 最大 mtime)：Rust 端按文件 mtime 排序，
+        追加写入旧会话（含续写到较早日期目录的会话）也会改变签名。只 stat 不读内容"""
+        count, newest = 0, 0
+        stack = [self.codex_dir / "sessions"]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for e in it:
+                        if e.is_dir():
+                            stack.append(e.path)
+                        elif e.name.endswith('.jsonl'):
+                            count += 1
+                            newest = max(newest, e.stat().st_mtime_ns)
+            except OSError:
+                continue
+        return count, newest
 
     def list_projects(self, with_cwd: bool = False, limit: int = 0, on_update=None) -> list:
-        projects = lh.list_projects('codex', limit if limit > 0 else 0)
+        sig = self._sessions_signature()
+        if self._proj_cache is None or self._proj_cache[0] != sig:
+            self._proj_cache = (sig, lh.list_projects('codex', 0))
+        projects = self._proj_cache[1]
+        if limit > 0:
+            projects = projects[:limit]
         if not with_cwd:
             return [p.cwd or p.id for p in projects]
         return [(p.cwd or p.id, p.cwd or p.id) for p in projects]
@@ -578,15 +826,20 @@ class CodexHistoryManager:
         """加载所有会话（用于预加载）"""
         projects = self.list_projects(limit=0)
         result = {}
-        for cwd in projects:
-            if callback:
-                callback(f"扫描: {cwd[:30]}...")
-            result[cwd] = self.load_project(cwd)
+        if not projects:
+            return result
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1, len(projects))) as pool:
+            for cwd, data in zip(projects, pool.map(self.load_project, projects)):
+                if callback:
+                    callback(f"扫描: {cwd[:30]}...")
+                result[cwd] = data
         return result
 
     def delete_session(self, date_group: str, session_id: str, info: dict) -> bool:
         try:
             lh.delete_session('codex', str(info['file']))
+            self._proj_cache = None
             return True
         except Exception:
             return False
@@ -608,12 +861,19 @@ history_cache = {"claude": None, "codex": None}
 # ========== 工具使用统计数据库 ==========
 class ToolUsageDB:
     """MCP 和 Skill 使用统计"""
+    FLUSH_INTERVAL = 2.0  # record_usage 缓冲的最长落盘延迟（秒）
+
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self._init_db()
+        # record_usage 的内存缓冲：(tool_type, tool_name, project_id) -> [次数, 最近时间]
+        self._pending: dict[tuple[str, str, str], list] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_timer = None
+        atexit.register(self.flush)
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('''CREATE TABLE IF NOT EXISTS tool_usage (
                 tool_type TEXT,
                 tool_name TEXT,
@@ -627,19 +887,22 @@ class ToolUsageDB:
                 key TEXT PRIMARY KEY,
                 value TEXT
             )''')
-            conn.commit()
+            # (tool_type, tool_name) 的查询已由主键前缀覆盖，只需补 project_id 索引
+            new_index = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='idx_usage_project'").fetchone()
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_usage_project ON tool_usage(project_id)')
+            if new_index:
+                conn.execute('ANALYZE')
 
     def get_last_sync_time(self) -> float:
         """获取上次同步时间戳"""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT value FROM sync_meta WHERE key="last_sync"').fetchone()
             return float(row[0]) if row else 0
 
     def set_last_sync_time(self, ts: float):
         """设置同步时间戳"""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('INSERT OR REPLACE INTO sync_meta (key, value) VALUES ("last_sync", ?)', (str(ts),))
-            conn.commit()
 
     def delete_by_session(self, project_id: str, session_id: str):
         """删除指定会话的统计（用于增量更新前清理）"""
@@ -647,32 +910,47 @@ class ToolUsageDB:
         pass  # 增量更新时直接覆盖即可
 
     def record_usage(self, tool_type: str, tool_name: str, project_id: str, timestamp: str = None):
-        """记录一次工具调用"""
+        """记录一次工具调用（先在内存中累加，定时或退出时批量写入）"""
         now = timestamp or datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''INSERT INTO tool_usage (tool_type, tool_name, project_id, call_count, last_used)
-                VALUES (?, ?, ?, 1, ?)
-                ON CONFLICT(tool_type, tool_name, project_id) DO UPDATE SET
-                call_count = call_count + 1, last_used = ?''',
-                (tool_type, tool_name, project_id, now, now))
-            conn.commit()
+        key = (tool_type, tool_name, project_id)
+        with self._pending_lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [1, now]
+            else:
+                entry[0] += 1
+                if now > entry[1]:
+                    entry[1] = now
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """把缓冲的调用计数一次性写入数据库"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if pending:
+            self.batch_record([(*key, count, last_used) for key, (count, last_used) in pending.items()])
 
     def batch_record(self, records: list[tuple[str, str, str, int, str]]):
         """批量记录: [(tool_type, tool_name, project_id, count, last_used), ...]"""
-        with sqlite3.connect(self.db_path) as conn:
-            for tool_type, tool_name, project_id, count, last_used in records:
-                conn.execute('''INSERT INTO tool_usage (tool_type, tool_name, project_id, call_count, last_used)
-                    VALUES (?, ?, ?, ?, ?)
-                    ON CONFLICT(tool_type, tool_name, project_id) DO UPDATE SET
-                    call_count = call_count + excluded.call_count,
-                    last_used = CASE WHEN excluded.last_used > last_used THEN excluded.last_used ELSE last_used END''',
-                    (tool_type, tool_name, project_id, count, last_used))
-            conn.commit()
+        # 语句只准备一次，由 executemany 在 C 层循环绑定参数；整批在一个事务内提交
+        with get_conn(self.db_path) as conn:
+            conn.executemany('''INSERT INTO tool_usage (tool_type, tool_name, project_id, call_count, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(tool_type, tool_name, project_id) DO UPDATE SET
+                call_count = call_count + excluded.call_count,
+                last_used = CASE WHEN excluded.last_used > last_used THEN excluded.last_used ELSE last_used END''',
+                records)
 
     def get_all_mcp(self) -> list[dict]:
         """获取所有 MCP 使用统计"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        self.flush()
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('''SELECT tool_name, SUM(call_count) as total_calls,
                 MAX(last_used) as last_used, COUNT(DISTINCT project_id) as project_count
                 FROM tool_usage WHERE tool_type='mcp'
@@ -681,8 +959,8 @@ class ToolUsageDB:
 
     def get_all_skills(self) -> list[dict]:
         """获取所有 Skill 使用统计"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        self.flush()
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('''SELECT tool_name, SUM(call_count) as total_calls,
                 MAX(last_used) as last_used, COUNT(DISTINCT project_id) as project_count
                 FROM tool_usage WHERE tool_type='skill'
@@ -691,17 +969,18 @@ class ToolUsageDB:
 
     def get_by_project(self, project_id: str) -> dict:
         """获取指定项目的工具使用统计"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        self.flush()
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM tool_usage WHERE project_id=?', (project_id,)).fetchall()
         return {'mcp': [dict(r) for r in rows if r['tool_type'] == 'mcp'],
                 'skill': [dict(r) for r in rows if r['tool_type'] == 'skill']}
 
     def clear_all(self):
         """清空所有统计数据"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pending_lock:
+            self._pending.clear()
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM tool_usage')
-            conn.commit()
 
 
 # 工具使用统计数据库实例
@@ -717,7 +996,7 @@ class MCPSkillLibrary:
         self._init_db()
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             # MCP 库
             conn.execute('''CREATE TABLE IF NOT EXISTS mcp_library (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -775,19 +1054,17 @@ class MCPSkillLibrary:
                 skill_preset TEXT,
                 updated_at TEXT
             )''')
-            conn.commit()
 
     # ===== MCP 库操作 =====
     def add_mcp(self, name: str, command: str = 'npx', args: str = '', env: str = '',
                 category: str = '其他', source: str = 'manual', description: str = '') -> bool:
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 conn.execute('''INSERT OR IGNORE INTO mcp_library
                     (name, command, args, env, category, source, description, created_at)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
                     (name, command, args, env, category, source, description, now))
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
@@ -799,46 +1076,40 @@ class MCPSkillLibrary:
             return False
         sql = f"UPDATE mcp_library SET {', '.join(f'{k}=?' for k, _ in updates)} WHERE name=?"
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 conn.execute(sql, [v for _, v in updates] + [name])
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
 
     def delete_mcp(self, name: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM mcp_library WHERE name=?', (name,))
-            conn.commit()
         return True
 
     def get_all_mcp(self) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM mcp_library ORDER BY name').fetchall()
         return [dict(r) for r in rows]
 
     def get_mcp(self, name: str) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT * FROM mcp_library WHERE name=?', (name,)).fetchone()
         return dict(row) if row else None
 
     def set_mcp_default(self, name: str, is_default: bool) -> bool:
         """设置 MCP 的默认状态"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 conn.execute('UPDATE mcp_library SET is_default=? WHERE name=?',
                             (1 if is_default else 0, name))
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
 
     def get_default_mcps(self) -> list[dict]:
         """获取所有标记为默认的 MCP"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM mcp_library WHERE is_default=1 ORDER BY name').fetchall()
         return [dict(r) for r in rows]
 
@@ -847,12 +1118,11 @@ class MCPSkillLibrary:
                   category: str = '其他', source: str = 'manual', description: str = '') -> bool:
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 conn.execute('''INSERT OR IGNORE INTO skill_library
                     (name, file_path, content, category, source, description, created_at)
                     VALUES (?, ?, ?, ?, ?, ?, ?)''',
                     (name, file_path, content, category, source, description, now))
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
@@ -864,28 +1134,24 @@ class MCPSkillLibrary:
             return False
         sql = f"UPDATE skill_library SET {', '.join(f'{k}=?' for k, _ in updates)} WHERE name=?"
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 conn.execute(sql, [v for _, v in updates] + [name])
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
 
     def delete_skill(self, name: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM skill_library WHERE name=?', (name,))
-            conn.commit()
         return True
 
     def get_all_skills(self) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM skill_library ORDER BY name').fetchall()
         return [dict(r) for r in rows]
 
     def get_skill(self, name: str) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT * FROM skill_library WHERE name=?', (name,)).fetchone()
         return dict(row) if row else None
 
@@ -893,26 +1159,23 @@ class MCPSkillLibrary:
     def add_mcp_preset(self, name: str, mcp_names: list[str], is_default: bool = False) -> bool:
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 if is_default:
                     conn.execute('UPDATE mcp_presets SET is_default=0')
                 conn.execute('''INSERT OR REPLACE INTO mcp_presets
                     (name, mcp_names, is_default, created_at) VALUES (?, ?, ?, ?)''',
                     (name, json.dumps(mcp_names), 1 if is_default else 0, now))
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
 
     def delete_mcp_preset(self, name: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM mcp_presets WHERE name=?', (name,))
-            conn.commit()
         return True
 
     def get_all_mcp_presets(self) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM mcp_presets ORDER BY is_default DESC, name').fetchall()
         result = []
         for r in rows:
@@ -922,8 +1185,7 @@ class MCPSkillLibrary:
         return result
 
     def get_default_mcp_preset(self) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT * FROM mcp_presets WHERE is_default=1').fetchone()
         if row:
             d = dict(row)
@@ -935,26 +1197,23 @@ class MCPSkillLibrary:
     def add_skill_preset(self, name: str, skill_names: list[str], is_default: bool = False) -> bool:
         now = datetime.now().isoformat()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_conn(self.db_path) as conn:
                 if is_default:
                     conn.execute('UPDATE skill_presets SET is_default=0')
                 conn.execute('''INSERT OR REPLACE INTO skill_presets
                     (name, skill_names, is_default, created_at) VALUES (?, ?, ?, ?)''',
                     (name, json.dumps(skill_names), 1 if is_default else 0, now))
-                conn.commit()
             return True
         except sqlite3.Error:
             return False
 
     def delete_skill_preset(self, name: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('DELETE FROM skill_presets WHERE name=?', (name,))
-            conn.commit()
         return True
 
     def get_all_skill_presets(self) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             rows = conn.execute('SELECT * FROM skill_presets ORDER BY is_default DESC, name').fetchall()
         result = []
         for r in rows:
@@ -964,8 +1223,7 @@ class MCPSkillLibrary:
         return result
 
     def get_default_skill_preset(self) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT * FROM skill_presets WHERE is_default=1').fetchone()
         if row:
             d = dict(row)
@@ -977,17 +1235,15 @@ class MCPSkillLibrary:
     def save_workdir_presets(self, workdir: str, mcp_preset: str = None, skill_preset: str = None):
         """保存工作文件夹的预设选择"""
         now = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
+        with get_conn(self.db_path) as conn:
             conn.execute('''INSERT OR REPLACE INTO workdir_presets (workdir, mcp_preset, skill_preset, updated_at)
                 VALUES (?, COALESCE(?, (SELECT mcp_preset FROM workdir_presets WHERE workdir=?)),
                         COALESCE(?, (SELECT skill_preset FROM workdir_presets WHERE workdir=?)), ?)''',
                 (workdir, mcp_preset, workdir, skill_preset, workdir, now))
-            conn.commit()
 
     def get_workdir_presets(self, workdir: str) -> dict:
         """获取工作文件夹的预设选择"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_read_conn(self.db_path) as conn:
             row = conn.execute('SELECT mcp_preset, skill_preset FROM workdir_presets WHERE workdir=?', (workdir,)).fetchone()
         return dict(row) if row else {'mcp_preset': None, 'skill_preset': None}
 
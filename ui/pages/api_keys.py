@@ -12,7 +12,7 @@ import time
 
 from ..common import (
     THEMES, CLI_TOOLS, save_configs, save_settings,
-    detect_terminals, detect_python_envs, write_prompt_to_cli, detect_prompt_from_file,
+    detect_terminals, detect_python_envs, write_prompt_to_cli_async, detect_prompt_from_file,
     show_snackbar, has_windows_terminal
 )
 from ..clipboard_paste import enable_clipboard_paste
@@ -1878,11 +1878,18 @@ def create_api_page(state):
         user_prompt = state.prompts.get(prompt_dropdown.value, {})
         user_content = user_prompt.get('content', '')
         user_id = prompt_dropdown.value
-        try:
-            file_path = write_prompt_to_cli(cli_type, system_content, user_content, user_id, work_dir_input.value)
-            show_snackbar(page, L['prompt_written'].format(file_path))
-        except Exception as ex:
-            show_snackbar(page, L['prompt_write_fail'].format(ex))
+
+        def on_written(file_path, ex):
+            # 回调在写入线程上触发，UI 更新交回 Flet 线程执行
+            if ex is None:
+                msg = L['prompt_written'].format(file_path)
+            else:
+                msg = L['prompt_write_fail'].format(ex)
+            page.run_thread(show_snackbar, page, msg)
+
+        # 文件读写放到后台线程，连续切换提示词时只落盘最后一次
+        write_prompt_to_cli_async(cli_type, system_content, user_content, user_id,
+                                  work_dir_input.value, callback=on_written)
 
     def on_prompt_change(e):
         """提示词选择变化时自动应用"""
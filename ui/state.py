@@ -5,7 +5,7 @@ from pathlib import Path
 from .common import (
     VERSION, THEMES, CONFIG_FILE, SETTINGS_FILE, DB_FILE, PROMPTS_FILE,
     CLI_TOOLS, BUILTIN_PROMPTS, OFFICIAL_MCP_SERVERS, MCP_MARKETPLACES,
-    load_configs, save_configs, load_prompts, save_prompts,
+    load_configs, save_configs, save_prompts,
     load_settings, save_settings, detect_terminals, detect_python_envs,
     get_localized, get_prompt_file_path, write_prompt_to_cli, detect_prompt_from_file,
     SYSTEM_PROMPT_START, SYSTEM_PROMPT_END, USER_PROMPT_START, USER_PROMPT_END
@@ -65,22 +65,30 @@ class AppState:
 
     def _init_builtin_prompts(self):
         """初始化内置提示词 - 中英文分离存储"""
-        for pid, p in BUILTIN_PROMPTS.items():
-            # 为每种语言创建独立的提示词
-            for lang in ['zh', 'en']:
-                lang_pid = f"{pid}_{lang}"
-                self.prompt_db.save({
-                    'id': lang_pid,
-                    'name': get_localized(p.get('name', ''), lang),
-                    'content': get_localized(p.get('content', ''), lang),
-                    'category': get_localized(p.get('category', ''), lang),
-                    'is_builtin': p.get('is_builtin', False),
-                    'prompt_type': p.get('prompt_type', 'user'),
-                })
-        # 从旧 JSON 迁移
+        # 全部内置提示词在一个事务内 upsert，不再每条单独开连接提交
+        self.prompt_db.save_many(
+            {
+                'id': f"{pid}_{lang}",
+                'name': get_localized(p.get('name', ''), lang),
+                'content': get_localized(p.get('content', ''), lang),
+                'category': get_localized(p.get('category', ''), lang),
+                'is_builtin': p.get('is_builtin', False),
+                'prompt_type': p.get('prompt_type', 'user'),
+            }
+            for pid, p in BUILTIN_PROMPTS.items()
+            for lang in ['zh', 'en']
+        )
+        # 从旧 JSON 迁移（仅一次：迁移后重命名旧文件，后续启动不再重复解析）
         if PROMPTS_FILE.exists():
-            old_prompts = load_prompts(self.lang)
+            try:
+                old_prompts = json.loads(PROMPTS_FILE.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                old_prompts = {}
             self.prompt_db.migrate_from_json(old_prompts)
+            try:
+                PROMPTS_FILE.replace(PROMPTS_FILE.with_suffix('.json.migrated'))
+            except OSError:
+                pass
 
     def get_theme(self):
         """获取当前主题配置"""